@@ -1,15 +1,21 @@
-import json
 import logging
 import os
+import queue
 import random
-import time
-from typing import Any, Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
+from sqlalchemy import insert, select
 
 from src.core.database import Ticket, init_db
+from src.core.rate_limiter import RateLimiter
+from src.core.retry import retry_on_429
+from src.core.utils import hash_normalized_description, normalize_description
 
 # --- Configuration ---
 # Set up logging to replace standard print statements for better observability
@@ -27,11 +33,57 @@ BATCH_SIZE = 5
 TOTAL_BATCHES = 1
 MODEL_NAME = "gemini-1.5-flash"  # Using 1.5 Flash for stability and speed
 
-
-def generate_batch(client: genai.Client, model_name: str, batch_size: int = 20) -> List[Dict[str, Any]]:
+# Concurrency & Proactive Throttling (keep below the provider quota to avoid 429 storms)
+MAX_WORKERS = 8
+REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
+TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+# Rough budget per call: ~200 prompt tokens + ~80 output tokens per generated ticket
+ESTIMATED_PROMPT_TOKENS = 200
+ESTIMATED_TOKENS_PER_TICKET = 80
+# Re-requests allowed when the model returns malformed JSON
+MAX_PARSE_ATTEMPTS = 3
+
+# Message passed between the generator threads and the single DB writer thread
+BatchResult = Optional[Tuple[int, List[Dict[str, Any]]]]
+
+
+@retry_on_429(max_retries=5, base_delay=4.0, fallback=None)
+def request_batch(
+    client: genai.Client,
+    model_name: str,
+    prompt: str,
+    estimated_tokens: int,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> Optional[str]:
+    """
+    Single generation call. Rate limits (429) are retried by `retry_on_429`,
+    honouring the server's Retry-After hint. Returns None on failure.
+    """
+    if rate_limiter:
+        rate_limiter.acquire(estimated_tokens)
+
+    response = client.models.generate_content(
+        model=model_name,
+        contents=prompt,
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            # High temperature for creativity and variety in test data
+            temperature=0.7,
+        ),
+    )
+    return response.text
+
+
+def generate_batch(
+    client: genai.Client,
+    model_name: str,
+    batch_size: int = 20,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> List[Dict[str, Any]]:
     """
     Asks Gemini to generate a batch of unique, realistic IT tickets in JSON format.
-    Includes retry logic to handle Rate Limits (429) during bulk generation.
+    Malformed responses are re-requested; rate limits are handled by `request_batch`.
+    When a `rate_limiter` is provided, capacity is acquired before every call.
     """
 
     prompt = f"""
@@ -48,54 +100,96 @@ def generate_batch(client: genai.Client, model_name: str, batch_size: int = 20)
     Example: [{{"description": "Mouse broken", "urgency": "Low", "user_id": "u99"}}]
     """
 
-    # Retry Configuration
-    max_retries = 5
-    base_delay = 4.0
+    estimated_tokens = ESTIMATED_PROMPT_TOKENS + ESTIMATED_TOKENS_PER_TICKET * batch_size
 
-    for attempt in range(max_retries):
-        try:
-            response = client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    # High temperature for creativity and variety in test data
-                    temperature=0.7,
-                ),
-            )
+    for _ in range(MAX_PARSE_ATTEMPTS):
+        response_text = request_batch(client, model_name, prompt, estimated_tokens, rate_limiter)
+        if response_text is None:
+            return []
 
+        try:
             # Parse the JSON response
-            data = json.loads(response.text)
-
-            # Basic validation: ensure it's a list
-            if isinstance(data, list):
-                return data
-            else:
-                logger.warning("AI returned valid JSON but not a list. Retrying...")
-                continue
-
-        except json.JSONDecodeError:
+            data = orjson.loads(response_text)
+        except orjson.JSONDecodeError:
             logger.error("Failed to decode JSON from AI response. Retrying...")
+            continue
+
+        # Basic validation: ensure it's a list
+        if isinstance(data, list):
+            return data
 
-        except Exception as e:
-            error_str = str(e)
-            if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-                if attempt == max_retries - 1:
-                    logger.error("Max retries exceeded for this batch.")
-                    return []
-
-                sleep_time = (base_delay * (2**attempt)) + random.uniform(0, 1)
-                logger.warning(
-                    f"Rate limit hit (429). Retrying in {sleep_time:.2f}s... (Attempt {attempt + 1})"
-                )
-                time.sleep(sleep_time)
-            else:
-                logger.error(f"Non-retriable error: {e}")
-                return []
+        logger.warning("AI returned valid JSON but not a list. Retrying...")
 
     return []
 
 
+def persist_batches(SessionLocal, results: "queue.Queue[BatchResult]", totals: Dict[str, int]) -> None:
+    """
+    Single consumer thread: the only place that touches the SQLAlchemy session,
+    since sessions are not thread-safe. Stops when it receives the `None` sentinel.
+
+    Tickets are de-duplicated by content hash (within the run and against the DB)
+    and each batch is written with one bulk INSERT.
+    """
+    seen_hashes = set()
+
+    with SessionLocal() as session:
+        while True:
+            item = results.get()
+            if item is None:
+                break
+
+            batch_number, tickets_data = item
+
+            # A failed batch (locked DB, malformed row, integrity error) must not kill the writer:
+            # producers would keep queueing into a dead consumer and the run would report success
+            batch_hashes = set()
+            try:
+                rows = []
+                for ticket_data in tickets_data:
+                    # Defensive coding: Validate fields strictly
+                    if "description" not in ticket_data or "urgency" not in ticket_data:
+                        continue
+
+                    # Normalize once: the same text feeds the hash and the stored column
+                    normalized_description = normalize_description(ticket_data["description"])
+                    content_hash = hash_normalized_description(normalized_description)
+                    if content_hash in seen_hashes:
+                        continue
+                    seen_hashes.add(content_hash)
+                    batch_hashes.add(content_hash)
+
+                    rows.append({
+                        # Fallback for user_id if the AI forgets it
+                        "user_id": str(ticket_data.get("user_id", f"u{random.randint(1000, 9999)}")),
+                        "description": ticket_data["description"],
+                        "normalized_description": normalized_description,
+                        "urgency": ticket_data["urgency"],
+                        "content_hash": content_hash,
+                        "status": "New",  # Important: So our main script picks them up later
+                    })
+
+                if rows:
+                    # One indexed IN (...) probe instead of a lookup per generated ticket
+                    existing = set(session.scalars(
+                        select(Ticket.content_hash).where(Ticket.content_hash.in_([row["content_hash"] for row in rows]))
+                    ))
+                    rows = [row for row in rows if row["content_hash"] not in existing]
+
+                if rows:
+                    session.execute(insert(Ticket), rows)
+                    session.commit()
+
+                totals["inserted"] += len(rows)
+                logger.info(f" -> Batch {batch_number} saved: {len(rows)} tickets inserted.")
+            except Exception as e:
+                session.rollback()
+                # Not inserted: identical tickets from later batches may still be saved
+                seen_hashes -= batch_hashes
+                totals["failed_batches"] += 1
+                logger.error(f" -> Batch {batch_number} could not be saved: {e}")
+
+
 def main() -> None:
     logger.info("--- Starting Synthetic Data Generation (Powered by Gemini) ---")
 
@@ -115,46 +209,40 @@ def main() -> None:
     db_url = os.getenv("DB_URL", "sqlite:///tickets.db")
     SessionLocal = init_db(db_url)
 
-    # 3. Generation Loop
-    total_inserted = 0
+    # 3. Concurrent Generation Pipeline
+    # N producer threads keep requests in flight; one consumer thread owns the DB session
+    rate_limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    results: "queue.Queue[BatchResult]" = queue.Queue()
+    totals = {"inserted": 0, "failed_batches": 0}
 
-    with SessionLocal() as session:
-        for i in range(TOTAL_BATCHES):
-            logger.info(f"Requesting Batch {i+1}/{TOTAL_BATCHES} from AI...")
-
-            tickets_data = generate_batch(client, MODEL_NAME, BATCH_SIZE)
-
-            if not tickets_data:
-                logger.warning(f"Batch {i+1} failed to generate data. Skipping.")
-                continue
-
-            count = 0
-            for item in tickets_data:
-                # Defensive coding: Validate fields strictly
-                if "description" in item and "urgency" in item:
-                    # Fallback for user_id if the AI forgets it
-                    uid = item.get("user_id", f"u{random.randint(1000, 9999)}")
-
-                    ticket = Ticket(
-                        user_id=str(uid),
-                        description=item["description"],
-                        urgency=item["urgency"],
-                        status="New",  # Important: So our main script picks them up later
-                    )
-                    session.add(ticket)
-                    count += 1
-
-            session.commit()
-            total_inserted += count
-            logger.info(f" -> Batch {i+1} saved: {count} tickets inserted.")
-
-            # Proactive Throttling: Sleep between batches to be a good API citizen
-            # This reduces the chance of hitting 429s in the first place
-            time.sleep(2)
-
-    logger.info(f"--- Data Generation Complete. Total inserted: {total_inserted} ---")
+    writer = threading.Thread(target=persist_batches, args=(SessionLocal, results, totals))
+    writer.start()
+
+    def produce(batch_index: int) -> None:
+        batch_number = batch_index + 1
+        logger.info(f"Requesting Batch {batch_number}/{TOTAL_BATCHES} from AI...")
+
+        tickets_data = generate_batch(client, MODEL_NAME, BATCH_SIZE, rate_limiter)
+        if not tickets_data:
+            logger.warning(f"Batch {batch_number} failed to generate data. Skipping.")
+            return
+
+        results.put((batch_number, tickets_data))
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # Consume the iterator so exceptions raised in producers surface here
+            list(executor.map(produce, range(TOTAL_BATCHES)))
+    finally:
+        # Sentinel: lets the writer drain the queue and exit cleanly
+        results.put(None)
+        writer.join()
+
+    if totals["failed_batches"]:
+        logger.error(f"{totals['failed_batches']} batch(es) failed to save; see the errors above.")
+    logger.info(f"--- Data Generation Complete. Total inserted: {totals['inserted']} ---")
     logger.info("Run 'python -m src.main' to classify these new tickets.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,117 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from sklearn.linear_model import LogisticRegression
+
+# Initialize logger for the local encoder classifier
+logger = logging.getLogger(__name__)
+
+
+class BertAdapter:
+    """
+    Fast local classifier: a BERT sentence encoder with a logistic-regression head.
+
+    Encoder classifiers beat few-shot LLM prompting on closed-set classification at a
+    fraction of the latency, so confident predictions skip the LLM entirely. The head is
+    trained on human-corrected tickets; until enough feedback exists it abstains and
+    every ticket falls through to the LLM.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "paraphrase-multilingual-MiniLM-L12-v2",
+        confidence_threshold: float = 0.85,
+        min_samples_per_class: int = 2,
+        encoder: Optional[SentenceTransformer] = None
+    ) -> None:
+        # Same multilingual encoder as the Semantic Cache, so Spanish/English tickets share one space.
+        # Pass the cache's instance to hold one copy of the model and encode each ticket once.
+        self.encoder = encoder if encoder is not None else SentenceTransformer(model_name)
+        self.confidence_threshold = confidence_threshold
+        self.min_samples_per_class = min_samples_per_class
+
+        self.head: Optional[LogisticRegression] = None
+        # Training buffer keyed by ticket ID: a re-corrected ticket replaces its old label
+        self._feedback: Dict[int, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        logger.info(f"BERT Adapter initialized with encoder {model_name} (threshold: {confidence_threshold})")
+
+    @property
+    def is_trained(self) -> bool:
+        return self.head is not None
+
+    def record_feedback(self, ticket_id: int, description: str, category: str) -> None:
+        """
+        Appends a human-verified label to the training buffer (used on the next retrain).
+        """
+        with self._lock:
+            self._feedback[ticket_id] = (description, category)
+
+    def retrain(self) -> bool:
+        """
+        Fits a fresh head on the feedback buffer and swaps it in atomically.
+
+        Returns:
+            bool: True if a head is active after the call.
+        """
+        with self._lock:
+            samples = list(self._feedback.values())
+
+        # Only keep categories with enough examples to learn a decision boundary
+        counts: Dict[str, int] = {}
+        for _, category in samples:
+            counts[category] = counts.get(category, 0) + 1
+        samples = [(desc, cat) for desc, cat in samples if counts[cat] >= self.min_samples_per_class]
+
+        if len({cat for _, cat in samples}) < 2:
+            logger.info(f"BERT head not trained: need 2+ categories with {self.min_samples_per_class}+ labelled tickets each.")
+            return self.is_trained
+
+        embeddings = self.encoder.encode(
+            [desc for desc, _ in samples], batch_size=64, normalize_embeddings=True
+        )
+        head = LogisticRegression(max_iter=1000)
+        head.fit(embeddings, [cat for _, cat in samples])
+
+        self.head = head
+        logger.info(f"🎓 BERT head retrained on {len(samples)} tickets across {len(head.classes_)} categories.")
+        return True
+
+    def predict_batch(
+        self,
+        descriptions: List[str],
+        embeddings: Optional[np.ndarray] = None
+    ) -> List[Tuple[Optional[str], float]]:
+        """
+        Classifies several descriptions with one encoder forward pass.
+
+        Args:
+            descriptions (List[str]): Ticket descriptions.
+            embeddings (Optional[np.ndarray]): Precomputed normalized encoder rows for the
+                descriptions (e.g. `SemanticCache.embed_with_base`), skipping the forward pass.
+
+        Returns:
+            List[Tuple[Optional[str], float]]: (category, confidence) per description. The
+                category is None when the head is untrained or confidence is below the threshold.
+        """
+        head = self.head
+        if head is None or not descriptions:
+            return [(None, 0.0) for _ in descriptions]
+
+        if embeddings is None:
+            embeddings = self.encoder.encode(descriptions, batch_size=64, normalize_embeddings=True)
+        probabilities = head.predict_proba(embeddings)
+
+        predictions = []
+        for row in probabilities:
+            best = int(row.argmax())
+            confidence = float(row[best])
+            category = head.classes_[best] if confidence >= self.confidence_threshold else None
+            predictions.append((category, confidence))
+        return predictions
+
+    def predict(self, description: str) -> Tuple[Optional[str], float]:
+        return self.predict_batch([description])[0]
@@ -1,30 +1,113 @@
 import logging
-import random
-import time
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 from google import genai
 from google.genai import types
 
+from src.core.retry import retry_on_429
+from src.core.utils import (
+    MIN_DESCRIPTION_LENGTH,
+    format_batch_listing,
+    parse_batch_response,
+    split_short_descriptions,
+)
 from src.interfaces.llm_provider import LLMProvider
 
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
 
+# --- PROMPT TEMPLATE SEGMENTS ---
+# Built once at import time; only the ticket-specific parts are concatenated per call
+PROMPT_HEADER_TEMPLATE = (
+    "Role: IT Service Desk Automation Bot.\n"
+    "Task: Classify {subject} into exactly one of these categories: {categories}.\n"
+)
+EXAMPLES_HEADER = "\nHere are some past examples of similar tickets and their CORRECT classifications:\n"
+TICKET_INTRO = '\nNow, classify this NEW ticket:\nTicket: "'
+TICKET_SUFFIX = '"\n\nConstraint: Return ONLY the category name. No markdown, no punctuation.\n'
+BATCH_INTRO = "\nNow, classify these NEW tickets:\n"
+BATCH_SUFFIX = (
+    "\n\nConstraint: Return ONLY a JSON object mapping each ticket number to its category name, "
+    'e.g. {"1": "<category>", "2": "<category>"}.\n'
+)
+
+# Generation configs are immutable per call shape, so they are shared as well
+SINGLE_TICKET_CONFIG = types.GenerateContentConfig(
+    temperature=0.0 # Zero temperature for deterministic classification
+)
+BATCH_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json",
+    temperature=0.0
+)
+
+
+@lru_cache(maxsize=4)
+def _get_client(api_key: str) -> genai.Client:
+    # One Client (HTTP transport + connection pool) per API key for the whole process
+    return genai.Client(api_key=api_key)
+
+
+@lru_cache(maxsize=16)
+def _render_prompt_header(categories: Tuple[str, ...], subject: str) -> str:
+    return PROMPT_HEADER_TEMPLATE.format(subject=subject, categories=list(categories))
+
+
+@lru_cache(maxsize=1024)
+def _render_examples_block(examples: Tuple[Tuple[str, str], ...]) -> str:
+    # Keyed by content (not object identity) so equal RAG contexts share one rendering
+    if not examples:
+        return ""
+
+    lines = [EXAMPLES_HEADER]
+    for ex_desc, ex_cat in examples:
+        # Sanitize inputs to prevent prompt injection or formatting breaks
+        ex_desc = ex_desc.replace("\n", " ")
+        lines.append(f"- Ticket: '{ex_desc}' -> Category: '{ex_cat}'\n")
+    return "".join(lines)
+
 
 class GeminiAdapter(LLMProvider):
     """
     Adapter implementation for Google Gemini API using the 'google-genai' SDK.
-    Includes Exponential Backoff strategy and Dynamic Few-Shot Prompting (RAG).
+    Includes Retry-After aware backoff and Dynamic Few-Shot Prompting (RAG).
     """
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(self, api_key: str, categories: Optional[List[str]] = None) -> None:
         if not api_key:
             raise ValueError("Gemini API Key is missing.")
 
-        self.client = genai.Client(api_key=api_key)
+        self.client = _get_client(api_key)
         self.model_name = "gemini-flash-latest"
 
+        # Categories are fixed for the process lifetime: render their prompt headers once
+        self._categories: Optional[List[str]] = None
+        self._single_prefix = ""
+        self._batch_prefix = ""
+        if categories:
+            self._specialize(categories)
+
+    def _specialize(self, categories: List[str]) -> None:
+        key = tuple(categories)
+        self._single_prefix = _render_prompt_header(key, "the ticket below")
+        self._batch_prefix = _render_prompt_header(key, "EACH ticket below")
+        # Published last so concurrent callers never pair new categories with stale prefixes
+        self._categories = categories
+
+    def _prefixes_for(self, categories: List[str]) -> Tuple[str, str]:
+        # Fast path: same list object as last time (config categories never change at runtime)
+        if categories is not self._categories:
+            self._specialize(categories)
+        return self._single_prefix, self._batch_prefix
+
+    @staticmethod
+    def _examples_block(context_examples: Optional[List[Dict[str, str]]]) -> str:
+        if not context_examples:
+            return ""
+        return _render_examples_block(tuple(
+            (ex.get("description", ""), ex.get("category", "Unclassified")) for ex in context_examples
+        ))
+
     def classify_ticket(
         self, 
         description: str, 
@@ -32,74 +115,65 @@ class GeminiAdapter(LLMProvider):
         context_examples: Optional[List[Dict[str, str]]] = None
     ) -> str:
 
-        # --- DYNAMIC PROMPT CONSTRUCTION (RAG / FEW-SHOT) ---
-        prompt = f"""
-        Role: IT Service Desk Automation Bot.
-        Task: Classify the ticket below into exactly one of these categories: {categories}.
-        """
+        # Junk input from scripts/synthetic callers is not worth an API call
+        if len(description) < MIN_DESCRIPTION_LENGTH:
+            return "Unclassified"
 
+        # --- DYNAMIC PROMPT CONSTRUCTION (RAG / FEW-SHOT) ---
         # Inject historical context if available (Human-in-the-Loop learning)
-        if context_examples:
-            prompt += "\nHere are some past examples of similar tickets and their CORRECT classifications:\n"
-            for ex in context_examples:
-                # Sanitize inputs to prevent prompt injection or formatting breaks
-                ex_desc = ex.get("description", "").replace("\n", " ")
-                ex_cat = ex.get("category", "Unclassified")
-                prompt += f"- Ticket: '{ex_desc}' -> Category: '{ex_cat}'\n"
-
-        prompt += f"""
-        Now, classify this NEW ticket:
-        Ticket: "{description}"
-
-        Constraint: Return ONLY the category name. No markdown, no punctuation.
+        single_prefix, _ = self._prefixes_for(categories)
+        prompt = "".join([
+            single_prefix,
+            self._examples_block(context_examples),
+            TICKET_INTRO,
+            description,
+            TICKET_SUFFIX,
+        ])
+
+        response_text = self._generate(prompt, SINGLE_TICKET_CONFIG)
+        return response_text.strip() if response_text is not None else "Unclassified"
+
+    def classify_batch(
+        self,
+        items: List[Tuple[int, str]],
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[int, str]:
+        items, results = split_short_descriptions(items)
+        if len(items) <= 1:
+            results.update(
+                (ticket_id, self.classify_ticket(description, categories, context_examples))
+                for ticket_id, description in items
+            )
+            return results
+
+        # One prompt for K tickets: the shared instructions are sent (and billed) once
+        _, batch_prefix = self._prefixes_for(categories)
+        prompt = "".join([
+            batch_prefix,
+            self._examples_block(context_examples),
+            BATCH_INTRO,
+            format_batch_listing(items),
+            BATCH_SUFFIX,
+        ])
+
+        response_text = self._generate(prompt, BATCH_CONFIG)
+        if response_text is None:
+            results.update((ticket_id, "Unclassified") for ticket_id, _ in items)
+            return results
+
+        results.update(parse_batch_response(response_text, items))
+        return results
+
+    @retry_on_429(max_retries=5, base_delay=4.0, fallback=None)
+    def _generate(self, prompt: str, config: types.GenerateContentConfig) -> Optional[str]:
         """
-
-        # --- RETRY LOGIC CONFIGURATION ---
-        max_retries = 5
-        base_delay = 4.0
-
-        for attempt in range(max_retries):
-            try:
-                # Attempt to generate content
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        temperature=0.0 # Zero temperature for deterministic classification
-                    ),
-                )
-
-                logger.debug(f"Ticket classified successfully on attempt {attempt + 1}")
-                return response.text.strip()
-
-            except Exception as e:
-                error_str = str(e)
-
-                # Check if the error is related to Rate Limiting (Quota Exceeded)
-                if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-                    if attempt == max_retries - 1:
-                        logger.error(
-                            "Max retries exceeded for ticket.",
-                            extra={"error": error_str, "ticket_snippet": description[:30]}
-                        )
-                        return "Unclassified"
-
-                    # Exponential Backoff + Jitter Strategy
-                    sleep_time = (base_delay * (2 ** attempt)) + random.uniform(0, 1)
-
-                    logger.warning(
-                        f"Rate limit hit (429). Retrying in {sleep_time:.2f}s...",
-                        extra={
-                            "attempt": attempt + 1,
-                            "max_retries": max_retries,
-                            "sleep_time": sleep_time
-                        }
-                    )
-                    time.sleep(sleep_time)
-
-                else:
-                    # Non-retriable errors
-                    logger.error("Gemini API Error (Non-Retriable)", extra={"error": error_str})
-                    return "Unclassified"
-
-        return "Unclassified"
\ No newline at end of file
+        Single Gemini call; rate limits are retried by `retry_on_429`.
+        Returns None when the call ultimately fails.
+        """
+        response = self.client.models.generate_content(
+            model=self.model_name,
+            contents=prompt,
+            config=config,
+        )
+        return response.text
@@ -1,12 +1,120 @@
 import logging
-import requests
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
+import httpx
+import orjson
+
+from src.core.utils import (
+    MIN_DESCRIPTION_LENGTH,
+    format_batch_listing,
+    parse_batch_response,
+    split_short_descriptions,
+)
 from src.interfaces.llm_provider import LLMProvider
 
 # Initialize logger for the local LLM adapter
 logger = logging.getLogger(__name__)
 
+# Extended timeout because local CPU inference is slow
+REQUEST_TIMEOUT_S = 180.0
+
+# Keep-alive pool shared by all in-flight classifications (avoids a TCP handshake per ticket)
+CONNECTION_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+
+# Streaming early-stop: a category name is only a few tokens, so cap decoding server-side too
+SINGLE_TICKET_OPTIONS = {
+    "temperature": 0.0, # Zero temperature for deterministic classification
+    "num_predict": 8,
+    "stop": ["\n", ".", ","]
+}
+# Shorter prefixes are too ambiguous with chatty openings (e.g. "So..." vs "Software Issue")
+MIN_EARLY_STOP_PREFIX = 4
+# Wrapping characters models like to add around the answer
+ANSWER_DECORATIONS = "\"'*`"
+
+# --- PROMPT TEMPLATE SEGMENTS ---
+# Built once at import time; only the ticket-specific parts are concatenated per call
+PROMPT_HEADER_TEMPLATE = "Role: IT Service Desk Bot. Classify {subject} into EXACTLY ONE of these categories: {categories}.\n\n"
+EXAMPLES_HEADER = "Historical Context (Learn from these):\n"
+TICKET_SUFFIX = "'\nConstraint: Output ONLY the category name. No explanations, no markdown."
+BATCH_SUFFIX = (
+    "Constraint: Output ONLY a JSON object mapping each ticket number to its category name, "
+    'e.g. {"1": "<category>", "2": "<category>"}. No explanations, no markdown.'
+)
+
+
+@lru_cache(maxsize=16)
+def _render_prompt_header(categories: Tuple[str, ...], subject: str) -> str:
+    return PROMPT_HEADER_TEMPLATE.format(subject=subject, categories=list(categories))
+
+
+@lru_cache(maxsize=1024)
+def _render_examples_block(examples: Tuple[Tuple[str, str], ...]) -> str:
+    # Keyed by content (order preserved) so equal RAG contexts share one rendering
+    if not examples:
+        return ""
+
+    lines = [EXAMPLES_HEADER]
+    for ex_desc, ex_cat in examples:
+        lines.append(f"- Ticket: '{ex_desc}' -> Category: '{ex_cat}'\n")
+    return "".join(lines)
+
+
+@lru_cache(maxsize=16)
+def _build_prefix_index(categories: Tuple[str, ...]) -> Dict[str, Optional[str]]:
+    """
+    Flattened trie: every lowercase prefix of every category, mapped to the category
+    it uniquely identifies (or None when several categories share it).
+    """
+    index: Dict[str, Optional[str]] = {}
+    for category in categories:
+        name = category.lower()
+        for end in range(1, len(name) + 1):
+            prefix = name[:end]
+            index[prefix] = category if index.get(prefix, category) == category else None
+    return index
+
+
+class _CategoryStreamMatcher:
+    """
+    Accumulates streamed tokens and decides as soon as the answer can only be one category.
+    """
+
+    def __init__(self, categories: List[str]) -> None:
+        self._index = _build_prefix_index(tuple(categories))
+        self._parts: List[str] = []
+        self._matching = True
+
+    def feed(self, line: str) -> Optional[str]:
+        """
+        Consumes one NDJSON line from Ollama. Returns the category once it is unambiguous.
+        """
+        if not line:
+            return None
+
+        self._parts.append(orjson.loads(line).get("response", ""))
+        if not self._matching:
+            return None
+
+        candidate = "".join(self._parts).strip().strip(ANSWER_DECORATIONS).lower()
+        if not candidate:
+            return None
+        if candidate not in self._index:
+            # The model went off-script: stop matching and let the full answer through
+            self._matching = False
+            return None
+
+        category = self._index[candidate]
+        if category and len(candidate) >= min(MIN_EARLY_STOP_PREFIX, len(category)):
+            return category
+        return None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts).strip() or "Unclassified"
+
+
 class OllamaAdapter(LLMProvider):
     """
     Adapter implementation for local LLMs using Ollama.
@@ -14,48 +122,192 @@ class OllamaAdapter(LLMProvider):
     """
 
     def __init__(self, host: str = "http://ollama:11434", model_name: str = "llama3") -> None:
-        self.api_url = f"{host}/api/generate"
         self.model_name = model_name
+
+        # Pooled clients: the async one serves the API worker, the sync one serves batch scripts
+        self.client = httpx.AsyncClient(base_url=host, timeout=REQUEST_TIMEOUT_S, limits=CONNECTION_LIMITS)
+        self.sync_client = httpx.Client(base_url=host, timeout=REQUEST_TIMEOUT_S, limits=CONNECTION_LIMITS)
         logger.info(f"Ollama Adapter initialized. Targeting model: {self.model_name} at {host}")
 
+    def _render_context(
+        self,
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None,
+        subject: str = "the ticket below"
+    ) -> str:
+
+        # --- PROMPT ENGINEERING FOR LOCAL LLM ---
+        # Categories are invariant and RAG contexts repeat, so both parts come from memoized renderers
+        header = _render_prompt_header(tuple(categories), subject)
+        if not context_examples:
+            return header
+
+        return header + _render_examples_block(tuple(
+            (ex.get("description", ""), ex.get("category", "")) for ex in context_examples
+        ))
+
+    def _build_payload(
+        self,
+        description: str,
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        prompt = "".join([
+            self._render_context(categories, context_examples),
+            "\nNew Ticket to classify: '",
+            description,
+            TICKET_SUFFIX,
+        ])
+
+        return {
+            "model": self.model_name,
+            "prompt": prompt,
+            # Streamed so we can hang up as soon as the category is known
+            "stream": True,
+            "options": SINGLE_TICKET_OPTIONS
+        }
+
+    def _build_batch_payload(
+        self,
+        items: List[Tuple[int, str]],
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        # One prompt for K tickets: the role/categories/examples prefill is paid once
+        prompt = "".join([
+            self._render_context(categories, context_examples, subject="each ticket below"),
+            "\nNew Tickets to classify:\n",
+            format_batch_listing(items),
+            "\n",
+            BATCH_SUFFIX,
+        ])
+
+        return {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": False,
+            "format": "json", # Constrain decoding to valid JSON
+            "options": {
+                "temperature": 0.0
+            }
+        }
+
     def classify_ticket(
         self,
         description: str,
         categories: List[str],
         context_examples: Optional[List[Dict[str, str]]] = None
     ) -> str:
+        # Junk input from scripts/synthetic callers is not worth a local inference pass
+        if len(description) < MIN_DESCRIPTION_LENGTH:
+            return "Unclassified"
 
-        # --- PROMPT ENGINEERING FOR LOCAL LLM ---
-        prompt = f"Role: IT Service Desk Bot. Classify the ticket below into EXACTLY ONE of these categories: {categories}.\n\n"
+        matcher = _CategoryStreamMatcher(categories)
+        try:
+            # Synchronous streamed POST over the keep-alive pool to the local Ollama container
+            with self.sync_client.stream(
+                "POST",
+                "/api/generate",
+                json=self._build_payload(description, categories, context_examples)
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    category = matcher.feed(line)
+                    if category:
+                        # Leaving the block closes the stream, which aborts the remaining decode
+                        return category
 
-        if context_examples:
-            prompt += "Historical Context (Learn from these):\n"
-            for ex in context_examples:
-                prompt += f"- Ticket: '{ex.get('description', '')}' -> Category: '{ex.get('category', '')}'\n"
+            return matcher.text
 
-        prompt += f"\nNew Ticket to classify: '{description}'\n"
-        prompt += "Constraint: Output ONLY the category name. No explanations, no markdown."
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            logger.error(f"Failed to communicate with local Ollama engine: {e}")
+            return "Unclassified"
 
+    async def classify_ticket_async(
+        self,
+        description: str,
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        if len(description) < MIN_DESCRIPTION_LENGTH:
+            return "Unclassified"
+
+        matcher = _CategoryStreamMatcher(categories)
         try:
-            # Execute synchronous HTTP POST to the local Ollama container
-            response = requests.post(
-                self.api_url,
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.0 # Zero temperature for deterministic classification
-                    }
-                },
-                timeout=180 # Extended timeout because local CPU inference is slow
+            # Non-blocking streamed POST: concurrent tickets share pooled keep-alive connections
+            async with self.client.stream(
+                "POST",
+                "/api/generate",
+                json=self._build_payload(description, categories, context_examples)
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    category = matcher.feed(line)
+                    if category:
+                        return category
+
+            return matcher.text
+
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            logger.error(f"Failed to communicate with local Ollama engine: {e}")
+            return "Unclassified"
+
+    def classify_batch(
+        self,
+        items: List[Tuple[int, str]],
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[int, str]:
+        items, results = split_short_descriptions(items)
+        if len(items) <= 1:
+            results.update(
+                (ticket_id, self.classify_ticket(description, categories, context_examples))
+                for ticket_id, description in items
+            )
+            return results
+
+        try:
+            response = self.sync_client.post(
+                "/api/generate",
+                json=self._build_batch_payload(items, categories, context_examples)
             )
             response.raise_for_status()
+            results.update(parse_batch_response(orjson.loads(response.content).get("response", ""), items))
+
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            logger.error(f"Failed to communicate with local Ollama engine: {e}")
+            results.update((ticket_id, "Unclassified") for ticket_id, _ in items)
+
+        return results
 
-            # Parse the JSON response
-            result = response.json()
-            return result.get("response", "Unclassified").strip()
+    async def classify_batch_async(
+        self,
+        items: List[Tuple[int, str]],
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[int, str]:
+        items, results = split_short_descriptions(items)
+        if len(items) == 1:
+            ticket_id, description = items[0]
+            results[ticket_id] = await self.classify_ticket_async(description, categories, context_examples)
+            return results
+        if not items:
+            return results
 
-        except requests.exceptions.RequestException as e:
+        try:
+            response = await self.client.post(
+                "/api/generate",
+                json=self._build_batch_payload(items, categories, context_examples)
+            )
+            response.raise_for_status()
+            results.update(parse_batch_response(orjson.loads(response.content).get("response", ""), items))
+
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
             logger.error(f"Failed to communicate with local Ollama engine: {e}")
-            return "Unclassified"
\ No newline at end of file
+            results.update((ticket_id, "Unclassified") for ticket_id, _ in items)
+
+        return results
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+        self.sync_client.close()
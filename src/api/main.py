@@ -1,17 +1,27 @@
+import asyncio
+import functools
 import logging
 import os
+import threading
 from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 # from src.adapters.gemini_adapter import GeminiAdapter
+from src.adapters.bert_adapter import BertAdapter
 from src.adapters.ollama_adapter import OllamaAdapter
 from src.api.schemas import ClassificationRequest, ClassificationResponse
-from src.core.config import get_categories, load_config
+from src.core.config import compile_category_pattern, get_categories, get_confidence_threshold, load_config
 from src.core.database import Ticket, init_db
 from src.core.semantic_cache import SemanticCache
+from src.core.utils import calculate_content_hash
+from src.interfaces.llm_provider import LLMProvider
 
 # Configure logger
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +29,39 @@ logger = logging.getLogger("API")
 
 app_state = {}
 
+# --- MICRO-BATCHING CONFIGURATION ---
+# Flush a batch to the LLM when it is full or when the oldest ticket has waited this long
+BATCH_MAX_SIZE = 8
+BATCH_MAX_WAIT_S = 0.25
+
+# --- BACKPRESSURE ---
+# Bounded queue + fixed worker pool: bursts beyond the backlog get HTTP 503 instead of
+# piling up unbounded work (and DB sessions) behind the LLM
+JOB_QUEUE_MAXSIZE = 1000
+N_WORKERS = 8
+OVERLOAD_RETRY_AFTER_S = 5
+
+# Short-lived cache for GET /tickets/{id}: absorbs tight client polling loops without
+# touching SQLite. Writers invalidate entries, so the TTL only bounds staleness for
+# changes made outside this process (e.g. the reconciliation script).
+status_cache: TTLCache = TTLCache(maxsize=1024, ttl=5)
+status_cache_lock = threading.Lock()
+# ticket_id -> [invalidation generation, readers] for polls whose DB read is in flight.
+# A poll only stores its payload if no writer invalidated the ticket while it was reading,
+# otherwise a Pending row read before the worker's commit would be cached after it.
+status_reads: Dict[int, List[int]] = {}
+
+# --- IN-FLIGHT REQUEST COALESCING ---
+# content_hash -> Future resolved with the leader ticket's (category, status) outcome.
+# Identical descriptions arriving while the leader is queued/processing wait on it
+# instead of paying for their own cache/BERT/LLM pass. Only touched from the event loop.
+inflight: Dict[str, "asyncio.Future[Tuple[Optional[str], str]]"] = {}
+
+# How often the local BERT head is refitted on accumulated human feedback (default: nightly)
+BERT_RETRAIN_INTERVAL_S = int(os.getenv("BERT_RETRAIN_INTERVAL_S", "86400"))
+# How often the Semantic Cache's distilled embedding head is refitted (default: nightly)
+EMBEDDING_HEAD_RETRAIN_INTERVAL_S = int(os.getenv("EMBEDDING_HEAD_RETRAIN_INTERVAL_S", "86400"))
+
 # @asynccontextmanager
 # async def lifespan(app: FastAPI):
 #     # Initialize infrastructure on startup
@@ -46,150 +89,501 @@ app_state = {}
 async def lifespan(app: FastAPI):
     logger.info("🚀 Starting API Gateway in Asynchronous Mode...")
 
-    app_state["categories"] = get_categories(load_config("config.yaml"))
+    config = load_config("config.yaml")
+    app_state["categories"] = get_categories(config)
+    # O(1) membership checks and a single compiled matcher for model output
+    app_state["categories_set"] = frozenset(app_state["categories"])
+    app_state["category_re"] = compile_category_pattern(app_state["categories"])
+    app_state["category_by_name"] = {category.lower(): category for category in app_state["categories"]}
     os.makedirs("/app/data", exist_ok=True)
     app_state["SessionLocal"] = init_db(os.getenv("DB_URL", "sqlite:////app/data/tickets.db"))
-    app_state["semantic_cache"] = SemanticCache(persist_directory="/app/chroma_data")
+    # Optional BM25 prefilter (off unless SEMANTIC_CACHE_BM25_MIN_SCORE is set; it trades cross-lingual hits for speed)
+    bm25_min_score = os.getenv("SEMANTIC_CACHE_BM25_MIN_SCORE")
+    app_state["semantic_cache"] = SemanticCache(
+        persist_directory="/app/chroma_data",
+        bm25_min_score=float(bm25_min_score) if bm25_min_score else None
+    )
+
+    # Fast path: local encoder classifier answers confident tickets before the LLM is involved
+    # (sharing the cache's base encoder: one model in memory, one forward pass per ticket)
+    app_state["bert"] = BertAdapter(
+        confidence_threshold=get_confidence_threshold(config),
+        encoder=getattr(app_state["semantic_cache"].embedding_function, "encoder", None)
+    )
 
     # --- SWAP THE LLM PROVIDER HERE ---
     # We bypass Gemini and inject the local Ollama adapter
     app_state["classifier"] = OllamaAdapter(host="http://ollama:11434", model_name="llama3")
     logger.info("🧠 Sovereign Local AI Adapter connected.")
 
-    yield
-    logger.info("🛑 Shutting down API Gateway...")
+    # Fixed pool of consumers, each coalescing queued tickets into batched LLM calls
+    app_state["job_queue"] = asyncio.Queue(maxsize=JOB_QUEUE_MAXSIZE)
+    collect_lock = asyncio.Lock()
+    background_jobs = [
+        *(asyncio.create_task(batch_worker(app_state["job_queue"], collect_lock)) for _ in range(N_WORKERS)),
+        asyncio.create_task(bert_retrain_loop(app_state["bert"])),
+        asyncio.create_task(embedding_head_retrain_loop(app_state["semantic_cache"])),
+    ]
+
+    try:
+        yield
+    finally:
+        logger.info("🛑 Shutting down API Gateway...")
+        for job in background_jobs:
+            job.cancel()
+        await asyncio.gather(*background_jobs, return_exceptions=True)
+        await app_state["classifier"].aclose()
 
 app = FastAPI(title="AI Triage Engine API", lifespan=lifespan)
 
-def get_db():
-    # Dependency injection for database sessions
-    db = app_state["SessionLocal"]()
+# --- THE BACKGROUND WORKER ---
+async def collect_batch(queue: "asyncio.Queue[Tuple[int, str]]") -> List[Tuple[int, str]]:
+    """
+    Waits for the first ticket, then keeps pulling until the batch is full
+    or BATCH_MAX_WAIT_S has elapsed, whichever comes first.
+    """
+    batch = [await queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BATCH_MAX_WAIT_S
+
+    while len(batch) < BATCH_MAX_SIZE:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+        except asyncio.TimeoutError:
+            break
+
+    return batch
+
+
+def persist_batch_results(results: Dict[int, Tuple[Optional[str], str]]) -> None:
+    """
+    Writes every (category, status) outcome of a batch in a single transaction.
+    Uses SQLAlchemy's bulk UPDATE by primary key (one executemany per column set,
+    no SELECT + ORM flush). A None category leaves the stored category untouched.
+    """
+    classified = [
+        {"id": ticket_id, "category": category, "status": status}
+        for ticket_id, (category, status) in results.items() if category is not None
+    ]
+    status_only = [
+        {"id": ticket_id, "status": status}
+        for ticket_id, (category, status) in results.items() if category is None
+    ]
+
+    db: Session = app_state["SessionLocal"]()
     try:
-        yield db
+        for mappings in (classified, status_only):
+            if mappings:
+                db.execute(update(Ticket), mappings)
+        db.commit()
     finally:
         db.close()
 
-# --- THE BACKGROUND WORKER ---
-def process_ticket_background(ticket_id: int, description: str) -> None:
+    invalidate_status_cache(results.keys())
+
+
+def canonicalize_category(response_text: str) -> str:
     """
-    Background worker that handles heavy I/O operations (ChromaDB & Gemini).
-    Executes independently of the main HTTP response thread.
+    Extracts the configured category named in a model answer (any casing, extra words
+    tolerated). Anything else becomes 'Unclassified' instead of being stored verbatim.
     """
-    # Create a fresh database session for the background thread to prevent lockups
-    db: Session = app_state["SessionLocal"]()
+    match = app_state["category_re"].search(response_text)
+    if not match:
+        return "Unclassified"
+    return app_state["category_by_name"][match.group(1).lower()]
+
+
+def invalidate_status_cache(ticket_ids) -> None:
+    with status_cache_lock:
+        for ticket_id in ticket_ids:
+            status_cache.pop(ticket_id, None)
+            read = status_reads.get(ticket_id)
+            if read is not None:
+                read[0] += 1
+
+
+async def process_ticket_batch(batch: List[Tuple[int, str]]) -> Dict[int, Tuple[Optional[str], str]]:
+    """
+    Background job that handles heavy I/O operations (ChromaDB & LLM) for a batch of tickets.
+    Cache misses the local BERT head is unsure about are classified with ONE LLM call;
+    blocking DB, vector and encoder calls are offloaded to the threadpool to keep the event loop free.
+    """
+    semantic_cache: SemanticCache = app_state["semantic_cache"]
+    bert: BertAdapter = app_state["bert"]
+    classifier: LLMProvider = app_state["classifier"]
+    results: Dict[int, Tuple[Optional[str], str]] = {}
+    # Tickets classified by a model (not the cache) teach the Semantic Cache afterwards
+    learned: List[Tuple[int, str]] = []
+
     try:
-        semantic_cache: SemanticCache = app_state["semantic_cache"]
-        classifier: GeminiAdapter = app_state["classifier"]
-        
-        ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-        if not ticket:
-            logger.error(f"Worker failed: Ticket {ticket_id} not found.")
-            return
-
-        # 1. Semantic Shield Check (Zero API Cost)
-        cached_category = semantic_cache.check_cache(description)
-        if cached_category:
-            ticket.category = cached_category
-            ticket.status = "Classified_By_Cache"
-            db.commit()
-            return
-
-        if not classifier:
-            ticket.status = "Failed_No_AI"
-            db.commit()
-            return
-
-        # 2. RAG: Fetch Context & Call LLM
-        past_examples = semantic_cache.get_similar_examples(description, limit=3)
-        category = classifier.classify_ticket(
-            description=description, 
-            categories=app_state["categories"], 
-            context_examples=past_examples
+        # 0. Embed every description once; lookup, RAG, BERT and cache teaching all reuse these rows
+        base_vectors, vectors = await run_in_threadpool(
+            semantic_cache.embed_with_base, [description for _, description in batch]
         )
-        
-        # 3. Persistence & Cache Teaching
-        ticket.category = category
-        ticket.status = "Classified_By_AI"
-        db.commit()
-        
-        semantic_cache.add_to_cache(str(ticket_id), description, category)
-        logger.info(f"✅ Background job complete for Ticket {ticket_id}: {category}")
+        row_of = {ticket_id: row for row, (ticket_id, _) in enumerate(batch)}
+
+        # 1. Semantic Shield Check (Zero API Cost) - one batched vector query
+        misses = []
+        cached_categories = await run_in_threadpool(
+            semantic_cache.check_cache_batch, [description for _, description in batch], 0.5, vectors
+        )
+        for (ticket_id, description), cached_category in zip(batch, cached_categories):
+            if cached_category:
+                results[ticket_id] = (cached_category, "Classified_By_Cache")
+            else:
+                misses.append((ticket_id, description))
+
+        # 2. Local BERT Fast Path (milliseconds, no LLM call) for confident predictions
+        if misses:
+            predictions = await run_in_threadpool(
+                bert.predict_batch,
+                [description for _, description in misses],
+                None if base_vectors is None else base_vectors[[row_of[ticket_id] for ticket_id, _ in misses]]
+            )
+            uncertain = []
+            for (ticket_id, description), (bert_category, _) in zip(misses, predictions):
+                if bert_category:
+                    results[ticket_id] = (bert_category, "Classified_By_BERT")
+                    learned.append((ticket_id, description))
+                else:
+                    uncertain.append((ticket_id, description))
+            misses = uncertain
+
+        if misses and not classifier:
+            for ticket_id, _ in misses:
+                results[ticket_id] = (None, "Failed_No_AI")
+            misses = []
+
+        if misses:
+            # 3. RAG: Shared few-shot context (nearest neighbours of every miss, de-duplicated)
+            past_examples = []
+            seen_descriptions = set()
+            examples_per_miss = await run_in_threadpool(
+                semantic_cache.get_similar_examples_batch,
+                [description for _, description in misses],
+                3,
+                vectors[[row_of[ticket_id] for ticket_id, _ in misses]]
+            )
+            for examples in examples_per_miss:
+                for example in examples:
+                    if example["description"] not in seen_descriptions:
+                        seen_descriptions.add(example["description"])
+                        past_examples.append(example)
+
+            misses_by_id = dict(misses)
+            categories_by_id = await classifier.classify_batch_async(
+                items=misses,
+                categories=app_state["categories"],
+                context_examples=past_examples
+            )
+            for ticket_id, _ in misses:
+                category = canonicalize_category(categories_by_id[ticket_id])
+                results[ticket_id] = (category, "Classified_By_AI")
+                if category != "Unclassified":
+                    learned.append((ticket_id, misses_by_id[ticket_id]))
+
+        # 4. Persistence (one commit for the whole batch) & Cache Teaching
+        await run_in_threadpool(persist_batch_results, results)
+
+        if learned:
+            await run_in_threadpool(
+                semantic_cache.add_many_to_cache,
+                [(str(ticket_id), description, results[ticket_id][0]) for ticket_id, description in learned],
+                vectors[[row_of[ticket_id] for ticket_id, _ in learned]]
+            )
+
+        logger.info("✅ Background batch complete: %d tickets (%d sent to the LLM).", len(batch), len(misses))
+        return results
 
     except Exception as e:
-        logger.error(f"Background processing error for Ticket {ticket_id}: {e}")
-        if 'ticket' in locals():
-            ticket.status = "Failed_Processing"
-            db.commit()
+        logger.error("Background processing error for batch %s: %s", [ticket_id for ticket_id, _ in batch], e)
+        failures = {ticket_id: (None, "Failed_Processing") for ticket_id, _ in batch}
+        await run_in_threadpool(persist_batch_results, failures)
+        return failures
+
+
+def schedule_ticket(ticket_id: int, description: str, content_hash: str) -> bool:
+    """
+    Runs on the event loop. Queues the ticket, or attaches it to an identical in-flight one.
+
+    Returns:
+        bool: True if the ticket was coalesced onto an in-flight leader.
+
+    Raises:
+        asyncio.QueueFull: If the job queue is at capacity (nothing is registered).
+    """
+    leader = inflight.get(content_hash)
+    if leader is not None:
+        leader.add_done_callback(functools.partial(copy_leader_outcome, ticket_id))
+        return True
+
+    app_state["job_queue"].put_nowait((ticket_id, description))
+    inflight[content_hash] = asyncio.get_running_loop().create_future()
+    return False
+
+
+def overloaded_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Classification backlog is full. Please retry later.",
+        headers={"Retry-After": str(OVERLOAD_RETRY_AFTER_S)}
+    )
+
+
+def copy_leader_outcome(ticket_id: int, leader: "asyncio.Future[Tuple[Optional[str], str]]") -> None:
+    """
+    Done-callback for coalesced tickets: persists the leader's category on the follower row.
+    """
+    category, status = leader.result()
+    outcome = (category, "Classified_By_Dedup") if category is not None else (category, status)
+    # Fire-and-forget on the default executor: the callback itself must not block the loop
+    write = asyncio.get_running_loop().run_in_executor(None, persist_batch_results, {ticket_id: outcome})
+    write.add_done_callback(functools.partial(log_follower_write_failure, ticket_id))
+
+
+def log_follower_write_failure(ticket_id: int, write: "asyncio.Future[None]") -> None:
+    # Nobody awaits the follower's write, so a failure would otherwise vanish silently
+    if not write.cancelled() and write.exception() is not None:
+        logger.error("Failed to persist coalesced ticket %s: %s", ticket_id, write.exception())
+
+
+def release_inflight(batch: List[Tuple[int, str]], outcomes: Dict[int, Tuple[Optional[str], str]]) -> None:
+    """
+    Resolves (and forgets) the leaders of a finished batch, waking any coalesced followers.
+    """
+    for ticket_id, description in batch:
+        leader = inflight.pop(calculate_content_hash(description), None)
+        if leader is not None and not leader.done():
+            leader.set_result(outcomes.get(ticket_id, (None, "Failed_Processing")))
+
+
+def load_human_feedback() -> List[Tuple[int, str, str]]:
+    """
+    Returns (ticket_id, description, category) for every human-corrected ticket.
+    """
+    db: Session = app_state["SessionLocal"]()
+    try:
+        return db.query(Ticket.id, Ticket.description, Ticket.category).filter(
+            Ticket.status == "Human_Corrected"
+        ).all()
     finally:
         db.close()
 
-# --- ASYNCHRONOUS INGESTION ENDPOINT ---
-@app.post("/classify", status_code=202)
-def ingest_ticket(request: ClassificationRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+
+def seed_bert_feedback(bert: BertAdapter) -> None:
     """
-    Ingests the ticket, saves as Pending, and returns HTTP 202 instantly.
-    The actual AI classification runs in the background.
+    Loads every human-corrected ticket into the BERT training buffer.
+    """
+    for ticket_id, description, category in load_human_feedback():
+        bert.record_feedback(ticket_id, description, category)
+
+
+async def bert_retrain_loop(bert: BertAdapter) -> None:
+    """
+    Seeds the BERT buffer from the DB, then refits the head every BERT_RETRAIN_INTERVAL_S.
+    """
+    try:
+        await run_in_threadpool(seed_bert_feedback, bert)
+    except Exception as e:
+        logger.error(f"Failed to load human feedback for the BERT head: {e}")
+
+    while True:
+        try:
+            await run_in_threadpool(bert.retrain)
+        except Exception as e:
+            logger.error(f"BERT head retraining failed: {e}")
+        await asyncio.sleep(BERT_RETRAIN_INTERVAL_S)
+
+
+def retrain_embedding_head(semantic_cache: SemanticCache) -> None:
+    """
+    Distills the cache embedder on human feedback (same category => should be a cache hit)
+    and re-embeds the stored tickets so they share the new space.
+    """
+    samples = [(description, category) for _, description, category in load_human_feedback()]
+    head = semantic_cache.embedding_function.train_head(samples)
+    if head is not None:
+        # Re-embeds the stored tickets with the new head before activating it
+        semantic_cache.reindex(head)
+
+
+async def embedding_head_retrain_loop(semantic_cache: SemanticCache) -> None:
+    """
+    Refits the Semantic Cache's distilled embedding head every EMBEDDING_HEAD_RETRAIN_INTERVAL_S.
+    The head trained on the previous run is loaded from disk at startup, so the first pass waits.
+    """
+    while True:
+        await asyncio.sleep(EMBEDDING_HEAD_RETRAIN_INTERVAL_S)
+        try:
+            await run_in_threadpool(retrain_embedding_head, semantic_cache)
+        except Exception as e:
+            logger.error(f"Embedding head retraining failed: {e}")
+
+
+async def batch_worker(queue: "asyncio.Queue[Tuple[int, str]]", collect_lock: asyncio.Lock) -> None:
+    """
+    Long-lived consumer: drains the job queue batch by batch until cancelled at shutdown.
+    Workers take turns filling a batch (so idle workers do not split a trickle of tickets
+    into singleton batches) but process their batches concurrently.
+    """
+    while True:
+        async with collect_lock:
+            batch = await collect_batch(queue)
+        outcomes: Dict[int, Tuple[Optional[str], str]] = {}
+        try:
+            outcomes = await process_ticket_batch(batch)
+        except Exception as e:
+            # Never let one bad batch kill the consumer
+            logger.error(f"Batch worker failed to record batch results: {e}")
+        finally:
+            release_inflight(batch, outcomes)
+            for _ in batch:
+                queue.task_done()
+
+# --- SYNCHRONOUS DB HELPERS (executed in the threadpool by the async endpoints) ---
+# Each helper opens and closes its own session inside its single threadpool hop, so status
+# cache hits and requests rejected with 503 never open a session at all.
+def persist_pending_ticket(description: str, content_hash: str) -> int:
+    """
+    Inserts the ticket as Pending and returns its ID.
     """
-    # 1. Immediate Persistence (State: Pending)
     new_ticket = Ticket(
         user_id="api_user",
-        description=request.description,
+        description=description,
         urgency="Medium",
+        content_hash=content_hash,
         status="Pending" # Important: We do not know the category yet
     )
-    db.add(new_ticket)
-    db.commit()
-    db.refresh(new_ticket)
+    db: Session = app_state["SessionLocal"]()
+    try:
+        db.add(new_ticket)
+        db.commit()
+        return new_ticket.id
+    finally:
+        db.close()
+
+
+def load_ticket_status(ticket_id: int) -> Optional[Dict[str, object]]:
+    db: Session = app_state["SessionLocal"]()
+    try:
+        ticket = db.get(Ticket, ticket_id)
+        if not ticket:
+            return None
+
+        return {
+            "ticket_id": ticket.id,
+            "description": ticket.description,
+            "category": ticket.category,
+            "status": ticket.status
+        }
+    finally:
+        db.close()
+
+
+def apply_human_feedback(ticket_id: int, correct_category: str) -> Optional[str]:
+    """
+    Stores the human label. Returns the ticket description, or None if the ticket does not exist.
+    """
+    db: Session = app_state["SessionLocal"]()
+    try:
+        ticket = db.get(Ticket, ticket_id)
+        if not ticket:
+            return None
+
+        ticket.category = correct_category
+        ticket.status = "Human_Corrected"
+        db.commit()
+        return ticket.description
+    finally:
+        db.close()
+
+# --- ASYNCHRONOUS INGESTION ENDPOINT ---
+@app.post("/classify", status_code=202)
+async def ingest_ticket(request: ClassificationRequest):
+    """
+    Ingests the ticket, saves as Pending, and returns HTTP 202 instantly.
+    The actual AI classification runs in the background.
+    """
+    # 0. Backpressure: shed load before writing anything (duplicates of in-flight tickets cost no queue slot)
+    content_hash = calculate_content_hash(request.description)
+    if app_state["job_queue"].full() and content_hash not in inflight:
+        raise overloaded_error()
+
+    # 1. Immediate Persistence (State: Pending) - only the blocking INSERT leaves the event loop
+    ticket_id = await run_in_threadpool(persist_pending_ticket, request.description, content_hash)
     
-    # 2. Delegate to Background Worker
-    background_tasks.add_task(process_ticket_background, new_ticket.id, request.description)
+    # 2. Delegate to the Batch Worker pool, or piggyback on an identical in-flight ticket
+    try:
+        schedule_ticket(ticket_id, request.description, content_hash)
+    except asyncio.QueueFull:
+        # The queue filled up during the INSERT: do not leave the row Pending forever
+        await run_in_threadpool(persist_batch_results, {ticket_id: (None, "Rejected_Overloaded")})
+        raise overloaded_error()
     
     # 3. Surgical Execution: Return instantly
     return {
         "message": "Ticket received and queued for processing.",
-        "ticket_id": new_ticket.id,
+        "ticket_id": ticket_id,
         "status": "Pending"
     }
 
 # --- STATUS POLLING ENDPOINT ---
 @app.get("/tickets/{ticket_id}")
-def get_ticket_status(ticket_id: int, db: Session = Depends(get_db)):
+async def get_ticket_status(ticket_id: int):
     """
     Allows the client to poll the status of their ticket.
     """
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    if not ticket:
+    with status_cache_lock:
+        cached = status_cache.get(ticket_id)
+        if cached is not None:
+            return cached
+        read = status_reads.setdefault(ticket_id, [0, 0])
+        read[1] += 1
+        generation = read[0]
+
+    payload = None
+    try:
+        payload = await run_in_threadpool(load_ticket_status, ticket_id)
+    finally:
+        with status_cache_lock:
+            read[1] -= 1
+            if read[1] == 0:
+                del status_reads[ticket_id]
+            # Checked and stored under one lock hold, so no invalidation can slip in between
+            if payload is not None and read[0] == generation:
+                status_cache[ticket_id] = payload
+
+    if payload is None:
         raise HTTPException(status_code=404, detail="Ticket not found.")
-    
-    return {
-        "ticket_id": ticket.id,
-        "description": ticket.description,
-        "category": ticket.category,
-        "status": ticket.status
-    }
+    return payload
 
 # --- HUMAN-IN-THE-LOOP ENDPOINT ---
 class FeedbackRequest(BaseModel):
     correct_category: str
 
 @app.post("/tickets/{ticket_id}/feedback")
-def submit_human_feedback(ticket_id: int, request: FeedbackRequest, db: Session = Depends(get_db)):
+async def submit_human_feedback(ticket_id: int, request: FeedbackRequest):
     """
     Overrides an AI classification and updates the Semantic Cache (RAG).
     """
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found in DB.")
-    
-    if request.correct_category not in app_state["categories"]:
+    if request.correct_category not in app_state["categories_set"]:
         raise HTTPException(status_code=400, detail="Invalid category.")
-    
-    old_category = ticket.category
-    ticket.category = request.correct_category
-    ticket.status = "Human_Corrected"
-    db.commit()
+
+    description = await run_in_threadpool(apply_human_feedback, ticket_id, request.correct_category)
+    if description is None:
+        raise HTTPException(status_code=404, detail="Ticket not found in DB.")
+    invalidate_status_cache([ticket_id])
     
     semantic_cache: SemanticCache = app_state["semantic_cache"]
-    semantic_cache.update_ticket_category(str(ticket_id), request.correct_category)
+    await run_in_threadpool(
+        semantic_cache.update_ticket_category, str(ticket_id), request.correct_category, description
+    )
+
+    # Ground truth for the next BERT head retrain
+    bert: BertAdapter = app_state["bert"]
+    bert.record_feedback(ticket_id, description, request.correct_category)
     
     return {"status": "success", "message": f"Ticket {ticket_id} updated to '{request.correct_category}'."}
\ No newline at end of file
@@ -1,11 +1,13 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 
+from src.core.utils import MIN_DESCRIPTION_LENGTH
+
 class ClassificationRequest(BaseModel):
     """
     DTO for incoming classification requests.
     """
-    description: str = Field(..., min_length=5, description="The raw text of the IT ticket")
+    description: str = Field(..., min_length=MIN_DESCRIPTION_LENGTH, description="The raw text of the IT ticket")
     request_id: Optional[str] = Field(None, description="Optional external ID for tracing")
 
 class ClassificationResponse(BaseModel):
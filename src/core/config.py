@@ -1,14 +1,28 @@
+import functools
 import logging
 import os
+import re
 import sys
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Pattern
 
 import yaml
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# libyaml's C loader is ~10x faster than the pure-Python one; fall back when PyYAML was built without it
+YamlSafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_yaml(path: str, mtime_ns: int) -> Dict[str, Any]:
+    # mtime_ns is part of the cache key only: editing the file invalidates the cached parse
+    with open(path, "r") as file:
+        config = yaml.load(file, Loader=YamlSafeLoader)
+        logger.info(f"Configuration loaded successfully from {path}")
+        return config
+
 def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
     """
     Loads the YAML configuration file from the project root.
@@ -17,7 +31,8 @@ def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
         config_path (str): Relative path to the config file.
 
     Returns:
-        Dict[str, Any]: The configuration dictionary.
+        Dict[str, Any]: The configuration dictionary. Parses are cached until the
+            file's mtime changes, so treat the result as read-only.
 
     Raises:
         FileNotFoundError: If the config file does not exist.
@@ -40,10 +55,8 @@ def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
         raise FileNotFoundError(f"Config file '{config_path}' is missing.")
 
     try:
-        with open(path, "r") as file:
-            config = yaml.safe_load(file)
-            logger.info(f"Configuration loaded successfully from {path}")
-            return config
+        resolved = str(path.resolve())
+        return _load_yaml(resolved, os.stat(resolved).st_mtime_ns)
 
     except yaml.YAMLError as e:
         logger.critical(f"Error parsing YAML configuration: {e}")
@@ -60,4 +73,19 @@ def get_categories(config: Dict[str, Any]) -> List[str]:
         return config["triage"]["categories"]
     except KeyError:
         logger.critical("Invalid Config: 'triage.categories' key is missing.")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+def get_confidence_threshold(config: Dict[str, Any], default: float = 0.85) -> float:
+    """
+    Helper to extract the auto-accept confidence threshold (optional key).
+    """
+    return float(config.get("triage", {}).get("confidence_threshold", default))
+
+def compile_category_pattern(categories: List[str]) -> Pattern[str]:
+    """
+    Compiles the category names into one case-insensitive alternation, built once per process.
+
+    Longer names are tried first so a category is never shadowed by a shorter one it contains.
+    """
+    alternatives = sorted(categories, key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(category) for category in alternatives) + r")\b", re.IGNORECASE)
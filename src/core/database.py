@@ -1,11 +1,34 @@
+import os
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, DateTime, Integer, String, Text, create_engine
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, String, Text, bindparam, create_engine, event, inspect, select, text, update
+)
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from src.core.utils import hash_normalized_description, normalize_description
+
 # Define the base class for ORM models
 Base = declarative_base()
 
+# Sized for the API's concurrency (async endpoints + batch worker + Ollama calls in flight)
+# instead of SQLAlchemy's default QueuePool(5, 10), which stalls under bursts
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "32"))
+DB_MAX_OVERFLOW = 16
+
+# Rows per page when backfilling `normalized_description` on databases created before the column
+NORMALIZED_BACKFILL_PAGE_SIZE = 1000
+
+# Hex length of the SHA256 content hashes written before the switch to XXH3-128 (32 hex chars)
+LEGACY_SHA256_HASH_LENGTH = 64
+
+
+def _normalized_description_default(context) -> str:
+    # Context-sensitive default: every INSERT (ORM or Core, single or executemany) stores the
+    # canonical form of its own description, so hash paths never re-run the normalization
+    return normalize_description(context.get_current_parameters()["description"])
+
 
 class Ticket(Base):
     """
@@ -13,6 +36,10 @@ class Ticket(Base):
     """
 
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Covering index for the dedup prefetch (hash IN (...) AND status AND category): index-only scan
+        Index("ix_tickets_hash_status_category", "content_hash", "status", "category"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(String(50), nullable=False)
@@ -23,9 +50,11 @@ class Ticket(Base):
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     description = Column(Text, nullable=False)
+    # Lowercased/stripped description (see `normalize_description`), filled at insert time
+    normalized_description = Column(Text, default=_normalized_description_default, nullable=True)
     urgency = Column(String(20), default="Medium")
 
-    # Stores SHA256 hash of the description for O(1) deduplication lookup
+    # Stores the XXH3-128 hash of the description for O(1) deduplication lookup
     content_hash = Column(String(64), index=True, nullable=True)
 
     # This field will be filled by our AI
@@ -41,6 +70,53 @@ class Ticket(Base):
         return f"<Ticket(id={self.id}, hash='{self.content_hash}' status='{self.status}')>"
 
 
+def _backfill_normalized_descriptions(engine: Engine) -> None:
+    """
+    Fills `normalized_description` for existing rows in primary-key pages.
+
+    Databases that predate the column also predate XXH3 content hashes, so legacy SHA256
+    `content_hash` values are recomputed in the same pass; otherwise historical tickets
+    would never match new hashes and every duplicate would cost a fresh AI call.
+
+    Normalization runs in Python rather than SQL `lower(trim(...))`: SQLite's lower() only
+    folds ASCII and trim() only strips spaces, which would not match `calculate_content_hash`.
+    """
+    tickets = Base.metadata.tables["tickets"]
+    last_id = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(tickets.c.id, tickets.c.description, tickets.c.content_hash)
+                .where(tickets.c.id > last_id)
+                .order_by(tickets.c.id)
+                .limit(NORMALIZED_BACKFILL_PAGE_SIZE)
+            ).all()
+            if not rows:
+                return
+
+            updates = []
+            for row_id, description, content_hash in rows:
+                normalized_description = normalize_description(description)
+                if content_hash is not None and len(content_hash) == LEGACY_SHA256_HASH_LENGTH:
+                    content_hash = hash_normalized_description(normalized_description)
+                updates.append({
+                    "row_id": row_id,
+                    "normalized_description": normalized_description,
+                    "new_content_hash": content_hash,
+                })
+
+            connection.execute(
+                update(tickets)
+                .where(tickets.c.id == bindparam("row_id"))
+                .values(
+                    normalized_description=bindparam("normalized_description"),
+                    content_hash=bindparam("new_content_hash"),
+                ),
+                updates
+            )
+        last_id = rows[-1][0]
+
+
 def init_db(db_url: str = "sqlite:///tickets.db") -> sessionmaker:
     """
     Initializes the database engine and creates tables if they don't exist.
@@ -51,9 +127,42 @@ def init_db(db_url: str = "sqlite:///tickets.db") -> sessionmaker:
     Returns:
         sessionmaker: A factory for creating new database sessions.
     """
+    engine_options = {"pool_pre_ping": True}
+    url = make_url(db_url)
+    if url.get_backend_name() == "sqlite":
+        # Pooled connections hop between threadpool workers; wait on locks instead of erroring
+        engine_options["connect_args"] = {"check_same_thread": False, "timeout": 10}
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        # In-memory SQLite uses a single shared connection, so pool sizing does not apply
+        engine_options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+
     # echo=False prevents SQL query spam in stdout, enabling cleaner JSON logs elsewhere
-    engine = create_engine(db_url, echo=False)
+    engine = create_engine(db_url, echo=False, **engine_options)
+
+    if engine.dialect.name == "sqlite":
+        # WAL lets readers proceed during writes and NORMAL sync fsyncs at checkpoints
+        # instead of every commit; busy_timeout waits for a lock rather than failing fast.
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
     Base.metadata.create_all(engine)
 
+    # Lightweight migration: create_all skips indexes added to tables that already exist
+    for index in Base.metadata.tables["tickets"].indexes:
+        index.create(engine, checkfirst=True)
+
+    # ...and columns as well
+    ticket_columns = {column["name"] for column in inspect(engine).get_columns("tickets")}
+    if "normalized_description" not in ticket_columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE tickets ADD COLUMN normalized_description TEXT"))
+        _backfill_normalized_descriptions(engine)
+
     # Return a configured session factory
     return sessionmaker(bind=engine)
\ No newline at end of file
@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from sentence_transformers import SentenceTransformer
+from torch import nn
+
+logger = logging.getLogger("DistilledEmbeddings")
+
+# File name of the trained head inside the Chroma persist directory
+HEAD_FILENAME = "head.pt"
+
+# --- CONTRASTIVE TRAINING CONFIGURATION ---
+MAX_TRAINING_PAIRS = 20_000
+TRAINING_EPOCHS = 30
+LEARNING_RATE = 1e-3
+# Different-category pairs are only penalized while their cosine similarity exceeds this margin
+NEGATIVE_MARGIN = 0.3
+
+
+class ProjectionHead(nn.Module):
+    """
+    Residual MLP applied on top of the frozen sentence embedding.
+
+    The output layer starts at zero, so an untrained head is the identity mapping
+    and adopting it never degrades the base model's neighbourhoods.
+    """
+
+    def __init__(self, dim: int, hidden_dim: int = 512) -> None:
+        super().__init__()
+        self.mlp = nn.Sequential(nn.Linear(dim, hidden_dim), nn.ReLU(), nn.Linear(hidden_dim, dim))
+        nn.init.zeros_(self.mlp[2].weight)
+        nn.init.zeros_(self.mlp[2].bias)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return nn.functional.normalize(x + self.mlp(x), dim=-1)
+
+
+def _sample_pairs(n: int) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Index pairs (i != j) for contrastive training: every pair when they fit in
+    MAX_TRAINING_PAIRS, otherwise MAX_TRAINING_PAIRS pairs drawn directly at random
+    (the full i<j list is quadratic in the number of corrected tickets).
+    """
+    if n * (n - 1) // 2 <= MAX_TRAINING_PAIRS:
+        return torch.triu_indices(n, n, offset=1).unbind(0)
+
+    left = torch.randint(0, n, (MAX_TRAINING_PAIRS,))
+    # Draw from the n-1 other indices and skip over `left`, so no pair pairs a sample with itself
+    right = torch.randint(0, n - 1, (MAX_TRAINING_PAIRS,))
+    right = right + (right >= left).long()
+    return left, right
+
+
+class DistilledEmbeddingFunction(EmbeddingFunction):
+    """
+    Chroma embedding function: base sentence encoder + optional distilled head.
+
+    Generic sentence similarity is a poor proxy for "same answer". The head is trained
+    on human-corrected tickets so that descriptions sharing a category move closer
+    together, turning more near-misses into legitimate cache hits.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "paraphrase-multilingual-MiniLM-L12-v2",
+        head_path: Optional[str] = None
+    ) -> None:
+        self.encoder = SentenceTransformer(model_name)
+        self.head_path = head_path
+        self.head: Optional[ProjectionHead] = None
+        self._lock = threading.Lock()
+
+        if head_path and os.path.exists(head_path):
+            try:
+                self.head = self._load_head(head_path)
+                logger.info(f"Loaded distilled embedding head from {head_path}")
+            except Exception as e:
+                logger.error(f"Ignoring unreadable embedding head at {head_path}: {e}")
+
+    def encode_base(self, texts: List[str]) -> np.ndarray:
+        """
+        Unit-length float32 rows from the frozen base encoder (before the distilled head).
+
+        Also the input space of `BertAdapter`, which shares this encoder.
+        """
+        return self.encoder.encode(
+            texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32, copy=False)
+
+    def project(self, base: np.ndarray, head: Optional[ProjectionHead] = None) -> np.ndarray:
+        """
+        Applies `head` (default: the active head, if any) to `encode_base` rows.
+        """
+        head = head if head is not None else self.head
+        if head is None:
+            return base
+
+        with torch.no_grad():
+            return head(torch.from_numpy(base)).numpy()
+
+    def __call__(self, input: Documents) -> Embeddings:
+        # Rows stay packed float32 arrays (1.5 KB per 384-d vector) instead of being boxed
+        # into Python float lists (~9 KB each); Chroma accepts numpy rows directly
+        return list(self.project(self.encode_base(list(input))))
+
+    def _load_head(self, path: str) -> ProjectionHead:
+        state = torch.load(path, map_location="cpu")
+        head = ProjectionHead(state["dim"], state["hidden_dim"])
+        head.load_state_dict(state["weights"])
+        head.eval()
+        return head
+
+    def train_head(self, samples: List[Tuple[str, str]]) -> Optional[ProjectionHead]:
+        """
+        Fits a new head on (description, category) ground truth without activating it.
+
+        Pairs of samples are the training examples: same category -> pull together,
+        different category -> push below NEGATIVE_MARGIN cosine similarity. Callers
+        re-embed the stored vectors with the returned head (`project(base, head)`) and
+        only then call `activate_head`, so queries never mix the old and new spaces.
+
+        Returns:
+            Optional[ProjectionHead]: The trained head, or None if there is not enough feedback.
+        """
+        if len({category for _, category in samples}) < 2:
+            logger.info("Embedding head not trained: need human-corrected tickets from 2+ categories.")
+            return None
+
+        with self._lock:
+            base = torch.from_numpy(self.encode_base([description for description, _ in samples]))
+            labels = [category for _, category in samples]
+
+            left, right = _sample_pairs(len(samples))
+            category_of = {category: index for index, category in enumerate(dict.fromkeys(labels))}
+            label_ids = torch.tensor([category_of[category] for category in labels])
+            same = (label_ids[left] == label_ids[right]).float()
+
+            head = ProjectionHead(base.shape[1])
+            optimizer = torch.optim.Adam(head.parameters(), lr=LEARNING_RATE)
+
+            head.train()
+            for _ in range(TRAINING_EPOCHS):
+                optimizer.zero_grad()
+                projected = head(base)
+                similarity = (projected[left] * projected[right]).sum(dim=-1)
+                # Contrastive loss: positives towards cos=1, negatives below the margin
+                loss = (
+                    same * (1 - similarity).pow(2)
+                    + (1 - same) * torch.clamp(similarity - NEGATIVE_MARGIN, min=0).pow(2)
+                ).mean()
+                loss.backward()
+                optimizer.step()
+            head.eval()
+
+        logger.info(f"🎓 Embedding head distilled on {len(samples)} tickets ({len(left)} pairs, final loss {loss.item():.4f}).")
+        return head
+
+    def activate_head(self, head: ProjectionHead) -> None:
+        """
+        Persists `head` next to the collection and makes it the active projection.
+        """
+        with self._lock:
+            if self.head_path:
+                torch.save(
+                    {"dim": head.mlp[0].in_features, "hidden_dim": head.mlp[0].out_features, "weights": head.state_dict()},
+                    self.head_path
+                )
+            self.head = head
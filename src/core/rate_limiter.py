@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket limiter enforcing both requests/min and tokens/min quotas.
+
+    Capacity refills continuously (elapsed seconds x quota / 60), so callers are
+    throttled *before* they hit the provider instead of reacting to 429s afterwards.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        if requests_per_minute <= 0 or tokens_per_minute <= 0:
+            raise ValueError("Rate limits must be positive.")
+
+        self.max_requests_per_minute = requests_per_minute
+        self.max_tokens_per_minute = tokens_per_minute
+
+        # Start with a full bucket so the first burst is not artificially delayed
+        self.available_request_capacity = requests_per_minute
+        self.available_token_capacity = tokens_per_minute
+        self.last_update_time = time.monotonic()
+
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_update_time
+        self.last_update_time = now
+
+        self.available_request_capacity = min(
+            self.available_request_capacity + elapsed * self.max_requests_per_minute / 60.0,
+            self.max_requests_per_minute,
+        )
+        self.available_token_capacity = min(
+            self.available_token_capacity + elapsed * self.max_tokens_per_minute / 60.0,
+            self.max_tokens_per_minute,
+        )
+
+    def acquire(self, estimated_tokens: int) -> None:
+        """
+        Blocks until one request slot and `estimated_tokens` tokens are available.
+
+        Args:
+            estimated_tokens (int): Expected token consumption of the upcoming call.
+        """
+        # A single call larger than the whole bucket could never be served; clamp it
+        tokens_needed = min(float(estimated_tokens), self.max_tokens_per_minute)
+
+        while True:
+            with self._lock:
+                self._refill()
+
+                if (
+                    self.available_request_capacity >= 1
+                    and self.available_token_capacity >= tokens_needed
+                ):
+                    self.available_request_capacity -= 1
+                    self.available_token_capacity -= tokens_needed
+                    return
+
+                # Time until both buckets have enough capacity again
+                request_deficit = max(0.0, 1 - self.available_request_capacity)
+                token_deficit = max(0.0, tokens_needed - self.available_token_capacity)
+                wait_time = max(
+                    request_deficit * 60.0 / self.max_requests_per_minute,
+                    token_deficit * 60.0 / self.max_tokens_per_minute,
+                )
+
+            logger.debug(f"Rate limiter saturated. Waiting {wait_time:.2f}s for capacity.")
+            time.sleep(wait_time)
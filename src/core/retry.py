@@ -0,0 +1,132 @@
+import functools
+import logging
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, TypeVar
+
+from google.genai import errors as genai_errors
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_RETRY_DELAY_PATTERN = re.compile(r"^\s*([0-9]*\.?[0-9]+)s?\s*$")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Detects provider quota errors (HTTP 429 / RESOURCE_EXHAUSTED) from the error type and
+    status code, not its message: stringifying every exception is costly under load and
+    a "429" substring can appear in unrelated errors.
+    """
+    if isinstance(error, genai_errors.APIError):
+        return error.code == 429 or error.status == "RESOURCE_EXHAUSTED"
+
+    # Plain HTTP clients (httpx / requests) expose the status on the attached response
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def _parse_seconds(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+
+    match = _RETRY_DELAY_PATTERN.match(str(value))
+    if match:
+        return float(match.group(1))
+
+    # Retry-After may also be an HTTP-date
+    try:
+        retry_at = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    Extracts the server-requested wait (in seconds) from a rate-limit error, if any.
+
+    Looks at the HTTP `Retry-After` header first, then at Google's
+    `google.rpc.RetryInfo.retryDelay` entry in the error payload.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None when the server gave no hint.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        retry_after = _parse_seconds(headers.get("retry-after"))
+        if retry_after is not None:
+            return retry_after
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        # google-genai keeps the raw JSON body, either wrapped in "error" or already unwrapped
+        payload = details.get("error", details)
+        for detail in payload.get("details", []) if isinstance(payload, dict) else []:
+            if isinstance(detail, dict) and str(detail.get("@type", "")).endswith("google.rpc.RetryInfo"):
+                return _parse_seconds(detail.get("retryDelay"))
+
+    return None
+
+
+def retry_on_429(max_retries: int = 5, base_delay: float = 4.0, fallback: Any = None) -> Callable[[F], F]:
+    """
+    Decorator retrying a provider call on rate limits.
+
+    Sleeps for the server-provided `Retry-After` (plus a small jitter) when available,
+    otherwise falls back to Exponential Backoff + Jitter. Non-retriable errors and
+    exhausted retries are logged and turned into `fallback`.
+
+    Args:
+        max_retries (int): Total attempts, including the first one.
+        base_delay (float): Initial backoff in seconds when the server gives no hint.
+        fallback (Any): Value returned when the call ultimately fails.
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            for attempt in range(max_retries):
+                try:
+                    return func(*args, **kwargs)
+
+                except Exception as e:
+                    if not is_rate_limit_error(e):
+                        logger.error(f"{func.__qualname__} failed (Non-Retriable)", extra={"error": str(e)})
+                        return fallback
+
+                    if attempt == max_retries - 1:
+                        logger.error(f"Max retries exceeded for {func.__qualname__}.", extra={"error": str(e)})
+                        return fallback
+
+                    retry_after = get_retry_after(e)
+                    if retry_after is not None:
+                        # The server told us exactly how long the quota window needs
+                        sleep_time = retry_after + random.uniform(0, 0.5)
+                    else:
+                        # Exponential Backoff + Jitter Strategy
+                        sleep_time = (base_delay * (2 ** attempt)) + random.uniform(0, 1)
+
+                    logger.warning(
+                        f"Rate limit hit (429). Retrying in {sleep_time:.2f}s...",
+                        extra={
+                            "attempt": attempt + 1,
+                            "max_retries": max_retries,
+                            "sleep_time": sleep_time,
+                            "server_hint": retry_after is not None
+                        }
+                    )
+                    time.sleep(sleep_time)
+
+            return fallback
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
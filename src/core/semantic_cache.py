@@ -1,11 +1,168 @@
 import logging
-from typing import Dict, List, Optional
-from chromadb.utils import embedding_functions
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
 
 import chromadb
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+from src.core.distilled_embeddings import HEAD_FILENAME, DistilledEmbeddingFunction, ProjectionHead
 
 logger = logging.getLogger("SemanticCache")
 
+COLLECTION_NAME = "ticket_cache"
+
+# Chroma persists metadata and the write-ahead log in this SQLite file
+CHROMA_SQLITE_FILENAME = "chroma.sqlite3"
+
+# Number of lexical candidates re-ranked with embeddings when the BM25 prefilter is on
+BM25_SHORTLIST_SIZE = 20
+
+# Page size used when re-embedding the whole collection after the embedder changes
+REINDEX_PAGE_SIZE = 500
+
+# Okapi BM25 parameters of the lexical prefilter (same defaults as rank_bm25)
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Smallest IDF a term can get in the BM25 prefilter (see `_IncrementalBM25`)
+BM25_IDF_FLOOR = 1e-3
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class _IncrementalBM25:
+    """
+    Okapi BM25 over an inverted index that grows in place (no rebuild on add).
+
+    Each term keeps a growable posting array (document rows + term frequencies), so adding a
+    ticket costs O(len(ticket)) and scoring a query only touches the postings of its terms
+    instead of looping over every document. IDF is derived from the live document frequency
+    at query time and clamped to BM25_IDF_FLOOR: Okapi IDF is negative for terms found in more
+    than half of the documents, and with the clamp a document scores > 0 exactly when it
+    shares a term with the query (so `bm25_min_score=0` means "at least one shared term").
+    Not thread-safe on its own: `SemanticCache` serializes access with `_bm25_lock`.
+    """
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self._doc_len = np.zeros(1024, dtype=np.float32)
+        self._total_len = 0
+        # term -> [document rows, term frequencies, used length]
+        self._postings: Dict[str, List[Any]] = {}
+
+    def add(self, doc_id: str, tokens: List[str]) -> None:
+        row = len(self.ids)
+        self.ids.append(doc_id)
+        if row == len(self._doc_len):
+            self._doc_len = np.resize(self._doc_len, 2 * row)
+        self._doc_len[row] = len(tokens)
+        self._total_len += len(tokens)
+
+        for term, frequency in Counter(tokens).items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = [np.empty(4, dtype=np.int64), np.empty(4, dtype=np.float32), 0]
+            rows, frequencies, size = posting
+            if size == len(rows):
+                posting[0] = rows = np.resize(rows, 2 * size)
+                posting[1] = frequencies = np.resize(frequencies, 2 * size)
+            rows[size] = row
+            frequencies[size] = frequency
+            posting[2] = size + 1
+
+    def shortlists(self, queries: List[List[str]], min_score: float, size: int) -> List[List[str]]:
+        """
+        Top `size` document IDs scoring above `min_score`, best first, for every tokenized query.
+        """
+        n_docs = len(self.ids)
+        if n_docs == 0:
+            return [[] for _ in queries]
+
+        # Length normalization is shared by the whole batch
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[:n_docs] / (self._total_len / n_docs))
+
+        results = []
+        for tokens in queries:
+            scores = np.zeros(n_docs, dtype=np.float32)
+            for term in tokens:
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                rows, frequencies, df = posting[0][:posting[2]], posting[1][:posting[2]], posting[2]
+                idf = max(math.log((n_docs - df + 0.5) / (df + 0.5)), BM25_IDF_FLOOR)
+                scores[rows] += idf * frequencies * (BM25_K1 + 1) / (frequencies + length_norm[rows])
+
+            matches = np.flatnonzero(scores > min_score)
+            top = matches[np.argsort(scores[matches])[::-1][:size]]
+            results.append([self.ids[row] for row in top])
+        return results
+
+
+def unit_rows(vectors: Any) -> np.ndarray:
+    """
+    L2-normalizes embedding rows as float32 (the "ip" space relies on unit vectors).
+
+    Chroma's HNSW segment stores float32 only, so vectors are not down-cast to FP16/int8 here.
+    A no-op for the default (already normalized) embedder, but vectors stored by older
+    releases (un-normalized MiniLM output) need it.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _enable_chroma_wal(persist_directory: str) -> None:
+    """
+    Best-effort switch of Chroma's SQLite file to WAL, so cache reads do not block on writers.
+
+    WAL is a property of the database file, so it is set through a short-lived connection
+    and sticks for every connection Chroma opens later (in any thread). Per-connection
+    PRAGMAs are deliberately not attempted: Chroma keeps one connection per thread, so they
+    would only reach the calling thread's connection.
+    """
+    sqlite_path = os.path.join(persist_directory, CHROMA_SQLITE_FILENAME)
+    if not os.path.exists(sqlite_path):
+        return
+
+    try:
+        with sqlite3.connect(sqlite_path, timeout=10) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.Error as e:
+        logger.warning(f"Could not enable WAL on {sqlite_path}: {e}")
+
+
+def hnsw_metadata(m: Optional[int] = None) -> Dict[str, Any]:
+    """
+    HNSW index settings for the cache collection, overridable via CHROMA_HNSW_* env vars.
+
+    Chroma's defaults (M=16, construction_ef=100, search_ef=10) favour build speed over
+    recall; a denser graph and a wider search beam find the true neighbour with fewer
+    misses. M and construction_ef only apply when the collection is (re)built, see
+    `src.scripts.tune_hnsw`.
+
+    Args:
+        m (Optional[int]): Explicit graph degree, overriding CHROMA_HNSW_M.
+    """
+    return {
+        # Every stored/query vector is unit-length (see `SemanticCache.embed`), so the inner
+        # product equals cosine similarity without the per-edge norm computations;
+        # distance = 1 - a.b keeps the same thresholds as cosine
+        "hnsw:space": "ip",
+        "hnsw:M": m or int(os.getenv("CHROMA_HNSW_M", "24")),
+        "hnsw:construction_ef": int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "128")),
+        "hnsw:search_ef": int(os.getenv("CHROMA_HNSW_SEARCH_EF", "64")),
+        "hnsw:batch_size": int(os.getenv("CHROMA_HNSW_BATCH_SIZE", "100")),
+        "hnsw:sync_threshold": int(os.getenv("CHROMA_HNSW_SYNC_THRESHOLD", "1000")),
+    }
+
 
 class SemanticCache:
     """
@@ -13,101 +170,373 @@ class SemanticCache:
     Uses ChromaDB's default local embedding model (all-MiniLM-L6-v2)
     to ensure zero API cost for text vectorization.
     """
-    def __init__(self, persist_directory: str = "./chroma_data") -> None:
+    def __init__(
+        self,
+        persist_directory: str = "./chroma_data",
+        bm25_min_score: Optional[float] = None,
+        embedding_function: Optional[EmbeddingFunction] = None
+    ) -> None:
+        """
+        Args:
+            persist_directory (str): Where ChromaDB stores the collection.
+            bm25_min_score (Optional[float]): Enables the BM25 lexical prefilter in `check_cache`:
+                only stored tickets scoring above this are compared with embeddings (0 = any shared
+                term), and tickets without such a candidate skip the embedding model.
+                None (default) disables it, because a purely lexical gate cannot match tickets
+                written in a different language than their cached twin.
+            embedding_function (Optional[EmbeddingFunction]): Swappable embedder. Defaults to the
+                multilingual encoder plus the distilled head stored next to the collection (if trained),
+                so every process sharing the directory embeds with the same weights.
+        """
         self.client = chromadb.PersistentClient(path=persist_directory)
+        _enable_chroma_wal(persist_directory)
 
         # Inyectamos un modelo optimizado para más de 50 idiomas (incluido español)
-        multilingual_ef = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="paraphrase-multilingual-MiniLM-L12-v2"
+        self.embedding_function = embedding_function or DistilledEmbeddingFunction(
+            model_name="paraphrase-multilingual-MiniLM-L12-v2",
+            head_path=os.path.join(persist_directory, HEAD_FILENAME)
         )
 
         self.collection = self.client.get_or_create_collection(
-            name="ticket_cache",
-            metadata={"hnsw:space": "cosine"},
-            embedding_function=multilingual_ef
+            name=COLLECTION_NAME,
+            metadata=hnsw_metadata(),
+            embedding_function=self.embedding_function
         )
+
+        # Cached size of the collection: the hot-path guards read this instead of a Chroma call
+        self._count_lock = threading.Lock()
+        self._count = self.collection.count()
+
+        # --- BM25 PREFILTER STATE ---
+        self.bm25_min_score = bm25_min_score
+        self._bm25_lock = threading.Lock()
+        self._bm25 = _IncrementalBM25()
+        if bm25_min_score is not None:
+            stored = self.collection.get(include=["documents"])
+            for ticket_id, document in zip(stored["ids"], stored["documents"]):
+                self._bm25.add(ticket_id, _tokenize(document or ""))
+
         logger.info(f"🧠 Multilingual Semantic Cache initialized at {persist_directory}")
 
-    def check_cache(self, description: str, threshold: float = 0.5) -> Optional[str]:
+    def _cached_count(self) -> int:
+        # Only an empty cache is re-checked, so vectors added by another process
+        # (e.g. the reconciliation script) are not ignored forever
+        if self._count == 0:
+            with self._count_lock:
+                self._count = self.collection.count()
+        return self._count
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds texts once with the cache's encoder (normalized FP32 rows).
+
+        Callers pass the result to the `embeddings=` arguments below, so a ticket that goes
+        through lookup -> RAG examples -> cache write is encoded once instead of three times.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return unit_rows(self.embedding_function(texts))
+
+    def embed_with_base(self, texts: List[str]) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        Like `embed`, but also returns the base encoder rows the cache vectors were projected from.
+
+        `BertAdapter` shares the cache's base encoder, so the API encodes each ticket once for
+        both. The base rows are None when the embedding function exposes no base encoder.
+        """
+        if not texts:
+            return None, self.embed(texts)
+
+        encode_base = getattr(self.embedding_function, "encode_base", None)
+        if encode_base is None:
+            return None, self.embed(texts)
+
+        base = encode_base(texts)
+        return base, unit_rows(self.embedding_function.project(base))
+
+    def _check_cache_prefiltered(
+        self,
+        descriptions: List[str],
+        threshold: float,
+        embeddings: Optional[np.ndarray] = None
+    ) -> List[Optional[str]]:
+        """
+        BM25 first; only the lexical shortlists are compared with embeddings.
+
+        The whole batch is scored in one pass over the inverted index and every shortlisted
+        vector is fetched with ONE Chroma read; tickets without a lexical candidate are never embedded.
+        """
+        with self._bm25_lock:
+            shortlists = self._bm25.shortlists(
+                [_tokenize(description) for description in descriptions], self.bm25_min_score, BM25_SHORTLIST_SIZE
+            )
+
+        categories: List[Optional[str]] = [None] * len(descriptions)
+        wanted = list(dict.fromkeys(ticket_id for shortlist in shortlists for ticket_id in shortlist))
+        if not wanted:
+            logger.warning("🛡️ Cache Miss. No lexical candidate for %d tickets.", len(descriptions))
+            return categories
+
+        candidates = self.collection.get(ids=wanted, include=["embeddings", "metadatas"])
+        row_of = {ticket_id: row for row, ticket_id in enumerate(candidates["ids"])}
+        # Stored rows may predate unit-length embeddings, so they are normalized before
+        # the dot product (which is then the cosine similarity)
+        vectors = unit_rows(candidates["embeddings"]) if row_of else None
+
+        queried = [position for position, shortlist in enumerate(shortlists) if shortlist]
+        if embeddings is None:
+            query_vectors = dict(zip(queried, self.embed([descriptions[position] for position in queried])))
+        else:
+            query_vectors = {position: embeddings[position] for position in queried}
+
+        for position, shortlist in enumerate(shortlists):
+            rows = [row_of[ticket_id] for ticket_id in shortlist if ticket_id in row_of]
+            if not rows:
+                logger.warning("🛡️ Cache Miss. No lexical candidate above BM25 score %s.", self.bm25_min_score)
+                continue
+
+            # Exact distance over the shortlist (cheaper than an HNSW walk for ~20 vectors)
+            similarities = vectors[rows] @ query_vectors[position]
+            best = int(np.argmax(similarities))
+            distance = float(1.0 - similarities[best])
+
+            if distance < threshold:
+                category = candidates["metadatas"][rows[best]]["category"]
+                logger.info("🎯 Semantic Match! Distance: %.4f (Threshold: %s) -> Category: '%s'", distance, threshold, category)
+                categories[position] = category
+            else:
+                logger.warning("🛡️ Cache Miss. Nearest lexical candidate distance was %.4f > %s.", distance, threshold)
+        return categories
+
+    def check_cache(
+        self,
+        description: str,
+        threshold: float = 0.5,
+        embedding: Optional[np.ndarray] = None
+    ) -> Optional[str]:
         """
         Searches the vector space for a semantically similar ticket to bypass the LLM.
         """
-        if self.collection.count() == 0:
-            return None
+        embeddings = None if embedding is None else np.asarray(embedding)[np.newaxis]
+        return self.check_cache_batch([description], threshold, embeddings)[0]
+
+    def check_cache_batch(
+        self,
+        descriptions: List[str],
+        threshold: float = 0.5,
+        embeddings: Optional[np.ndarray] = None
+    ) -> List[Optional[str]]:
+        """
+        Batched `check_cache`: one embedding pass and one HNSW query for all descriptions.
+
+        Args:
+            descriptions (List[str]): Ticket descriptions.
+            threshold (float): Maximum cosine distance accepted as a hit.
+            embeddings (Optional[np.ndarray]): Precomputed `embed(descriptions)`, if available.
+
+        Returns:
+            List[Optional[str]]: The cached category (or None on a miss) per description, in input order.
+        """
+        if not descriptions or self._cached_count() == 0:
+            return [None] * len(descriptions)
+
+        if self.bm25_min_score is not None:
+            return self._check_cache_prefiltered(descriptions, threshold, embeddings)
 
         # Query the vector database (runs locally, 0 API cost)
         results = self.collection.query(
-            query_texts=[description],
+            query_embeddings=embeddings if embeddings is not None else self.embed(descriptions),
             n_results=1
         )
-        
-        if not results["distances"] or not results["distances"][0]:
-            return None
 
-        distance = results["distances"][0][0]
-        
-        if distance < threshold:
-            category = results["metadatas"][0][0]["category"]
-            logger.info(f"🎯 Semantic Match! Distance: {distance:.4f} (Threshold: {threshold}) -> Category: '{category}'")
-            return category
-        
-        logger.warning(f"🛡️ Cache Miss. Nearest neighbor distance was {distance:.4f} > {threshold}.")
-        return None
+        categories: List[Optional[str]] = []
+        for distances, metadatas in zip(results["distances"] or [], results["metadatas"] or []):
+            if not distances:
+                categories.append(None)
+                continue
 
-    def add_to_cache(self, ticket_id: str, description: str, category: str) -> None:
+            distance = distances[0]
+            if distance < threshold:
+                category = metadatas[0]["category"]
+                logger.info("🎯 Semantic Match! Distance: %.4f (Threshold: %s) -> Category: '%s'", distance, threshold, category)
+                categories.append(category)
+            else:
+                logger.warning("🛡️ Cache Miss. Nearest neighbor distance was %.4f > %s.", distance, threshold)
+                categories.append(None)
+
+        # Defensive padding in case Chroma returned fewer rows than queries
+        categories.extend([None] * (len(descriptions) - len(categories)))
+        return categories
+
+    def add_to_cache(
+        self,
+        ticket_id: str,
+        description: str,
+        category: str,
+        embedding: Optional[np.ndarray] = None
+    ) -> None:
         """
         Adds a newly classified ticket to the vector space.
         """
+        embeddings = None if embedding is None else np.asarray(embedding)[np.newaxis]
+        self.add_many_to_cache([(str(ticket_id), description, category)], embeddings)
+
+    def add_many_to_cache(
+        self,
+        items: List[Tuple[str, str, str]],
+        embeddings: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Adds several classified tickets with ONE embedding pass and ONE Chroma write
+        (a single SQLite transaction instead of one per ticket).
+
+        Args:
+            items (List[Tuple[str, str, str]]): (ticket_id, description, category) triples.
+            embeddings (Optional[np.ndarray]): Precomputed embeddings of the descriptions, if available.
+        """
+        if not items:
+            return
+
+        # Transpose the triples into columns (SoA) once instead of unpacking every row per field
+        ticket_ids, documents, categories = zip(*items)
+        ids = [str(ticket_id) for ticket_id in ticket_ids]
+        documents = list(documents)
+        # Chroma needs one metadata mapping per row, but only a handful of categories exist:
+        # rows share one read-only dict per category instead of allocating a dict each
+        metadata_by_category = {category: {"category": category} for category in set(categories)}
+        metadatas = list(map(metadata_by_category.__getitem__, categories))
+
+        # Embed outside Chroma so the whole batch goes through the encoder at once
         self.collection.add(
-            documents=[description],
-            metadatas=[{"category": category}],
-            ids=[str(ticket_id)]
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            embeddings=embeddings if embeddings is not None else self.embed(documents)
         )
-        logger.debug(f"Added Ticket {ticket_id} to Semantic Cache.")
+        with self._count_lock:
+            self._count += len(ids)
+        if self.bm25_min_score is not None:
+            # Incremental: the new tickets' postings are appended, nothing is rebuilt
+            tokenized = [_tokenize(description) for description in documents]
+            with self._bm25_lock:
+                for ticket_id, tokens in zip(ids, tokenized):
+                    self._bm25.add(ticket_id, tokens)
+        logger.debug("Added %d tickets to Semantic Cache.", len(ids))
 
-    def get_similar_examples(self, description: str, limit: int = 3) -> List[Dict[str, str]]:
+    def get_similar_examples(
+        self,
+        description: str,
+        limit: int = 3,
+        embedding: Optional[np.ndarray] = None
+    ) -> List[Dict[str, str]]:
         """
         RAG Component: Retrieves the nearest neighbors for dynamic Few-Shot prompting.
         It bypasses the strict threshold to provide the LLM with the closest conceptual context.
         """
-        if self.collection.count() == 0:
-            return []
+        embeddings = None if embedding is None else np.asarray(embedding)[np.newaxis]
+        return self.get_similar_examples_batch([description], limit, embeddings)[0]
+
+    def get_similar_examples_batch(
+        self,
+        descriptions: List[str],
+        limit: int = 3,
+        embeddings: Optional[np.ndarray] = None
+    ) -> List[List[Dict[str, str]]]:
+        """
+        Batched `get_similar_examples`: one query for all descriptions, demultiplexed per input.
+        `embeddings` may carry the precomputed `embed(descriptions)`.
+        """
+        count = self._cached_count()
+        if not descriptions or count == 0:
+            return [[] for _ in descriptions]
 
         # Prevent requesting more results than elements in the database
-        safe_limit = min(limit, self.collection.count())
+        safe_limit = min(limit, count)
         
         results = self.collection.query(
-            query_texts=[description],
+            query_embeddings=embeddings if embeddings is not None else self.embed(descriptions),
             n_results=safe_limit
         )
 
-        examples = []
-        if results["documents"] and results["metadatas"]:
-            for i in range(len(results["documents"][0])):
-                examples.append({
-                    "description": results["documents"][0][i],
-                    "category": results["metadatas"][0][i]["category"]
-                })
-        
-        logger.debug(f"🧠 Retrieved {len(examples)} historical examples for context.")
-        return examples
+        # Single zipped walk over Chroma's parallel result columns (no per-row index lookups)
+        batches: List[List[Dict[str, str]]] = [
+            [{"description": document, "category": metadata["category"]} for document, metadata in zip(documents, metadatas)]
+            for documents, metadatas in zip(results["documents"] or [], results["metadatas"] or [])
+        ]
+        batches.extend([] for _ in range(len(descriptions) - len(batches)))
 
-    def update_ticket_category(self, ticket_id: str, new_category: str) -> None:
+        logger.debug("🧠 Retrieved historical examples for %d tickets in one query.", len(descriptions))
+        return batches
+
+    def update_ticket_category(self, ticket_id: str, new_category: str, description: Optional[str] = None) -> None:
         """
         Human-in-the-Loop: Updates the ground truth in the vector space after human correction.
+
+        Tickets that were never cached (cache hits, failures, 'Unclassified') are added with
+        the corrected category when their `description` is given, so the correction still
+        teaches the cache.
         """
         try:
-            # We fetch the existing document first because Chroma requires the text to update metadata easily
-            result = self.collection.get(ids=[str(ticket_id)])
-            
-            if result and result["documents"] and len(result["documents"]) > 0:
+            # ID-only lookup (no documents/embeddings fetched): Chroma silently ignores updates to unknown IDs
+            if self.collection.get(ids=[str(ticket_id)], include=[])["ids"]:
+                # Metadata-only update: Chroma leaves the stored document and embedding untouched,
+                # so there is no re-embedding
                 self.collection.update(
                     ids=[str(ticket_id)],
-                    documents=result["documents"], # Keep the original text intact
                     metadatas=[{"category": new_category}] # Update the corrected category
                 )
                 logger.info(f"🔄 Ground Truth Updated for Ticket {ticket_id} -> '{new_category}'")
+            elif description is not None:
+                self.add_to_cache(str(ticket_id), description, new_category)
+                logger.info(f"🔄 Ground Truth Added for uncached Ticket {ticket_id} -> '{new_category}'")
             else:
-                logger.warning(f"Could not find Ticket {ticket_id} in vector cache to update.")
+                logger.warning(f"Ticket {ticket_id} not found in vector cache; correction not applied there.")
         except Exception as e:
-            logger.error(f"Failed to update vector cache: {e}")
\ No newline at end of file
+            logger.error(f"Failed to update vector cache: {e}")
+
+    def reindex(self, head: Optional[ProjectionHead] = None) -> int:
+        """
+        Re-embeds every stored ticket with the current embedding function.
+
+        Must run after the embedder changes (e.g. a new distilled head), otherwise
+        queries and stored vectors would live in different spaces. With `head` (a freshly
+        trained `DistilledEmbeddingFunction` head), every row is re-embedded with it first
+        and the head is activated only afterwards, so lookups keep using the old head
+        against old-space rows while the (slow) encoding runs. Only embeddings are
+        written, so category corrections made meanwhile are never overwritten.
+
+        Returns:
+            int: Number of re-embedded tickets.
+        """
+        pages: List[Tuple[List[str], np.ndarray]] = []
+        total = self.collection.count()
+        for offset in range(0, total, REINDEX_PAGE_SIZE):
+            page = self.collection.get(include=["documents"], limit=REINDEX_PAGE_SIZE, offset=offset)
+            if not page["ids"]:
+                break
+            pages.append((page["ids"], self._embed_for_head(page["documents"], head)))
+
+        if head is not None:
+            self.embedding_function.activate_head(head)
+
+        reindexed = set()
+        for ids, vectors in pages:
+            self.collection.update(ids=ids, embeddings=vectors)
+            reindexed.update(ids)
+
+        if head is not None:
+            # Tickets cached while the pages were encoding were embedded with the old head
+            late_ids = [ticket_id for ticket_id in self.collection.get(include=[])["ids"] if ticket_id not in reindexed]
+            if late_ids:
+                late = self.collection.get(ids=late_ids, include=["documents"])
+                self.collection.update(ids=late["ids"], embeddings=self.embed(late["documents"]))
+                reindexed.update(late["ids"])
+
+        logger.info(f"♻️ Semantic Cache re-indexed: {len(reindexed)} tickets re-embedded.")
+        return len(reindexed)
+
+    def _embed_for_head(self, texts: List[str], head: Optional[ProjectionHead]) -> np.ndarray:
+        # Rows in the space of a not-yet-active head (or of the current embedder when None)
+        if head is None:
+            return self.embed(texts)
+        return unit_rows(self.embedding_function.project(self.embedding_function.encode_base(texts), head))
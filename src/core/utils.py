@@ -1,8 +1,47 @@
-import hashlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
+import orjson
+import xxhash
+
+# Shortest description worth classifying (shared by the API schema and the LLM adapters)
+MIN_DESCRIPTION_LENGTH = 5
+
+def normalize_description(text: str) -> str:
+    """
+    Canonical form of a description for deduplication ('Mouse Broken' == 'mouse broken ').
+
+    Stored on `Ticket.normalized_description` at insert time so hash paths can skip it.
+
+    Args:
+        text (str): The raw ticket description.
+
+    Returns:
+        str: The lowercased, stripped description.
+    """
+    return text.lower().strip()
+
+def hash_normalized_description(normalized_text: str) -> str:
+    """
+    Hashes a description that is already in `normalize_description` form (XXH3-128 hex).
+
+    Args:
+        normalized_text (str): Output of `normalize_description`, e.g. `Ticket.normalized_description`.
+
+    Returns:
+        str: The hexadecimal hash string, identical to `calculate_content_hash` of the raw text.
+    """
+    return xxhash.xxh3_128_hexdigest(normalized_text.encode("utf-8"))
+
+@lru_cache(maxsize=4096)
 def calculate_content_hash(text: str) -> str:
     """
-    Computes the SHA256 hash of a string for idempotency checks.
+    Computes a fast non-cryptographic hash (XXH3-128) of a string for idempotency checks.
+
+    The hash only feeds equality lookups, so SHA256's cryptographic guarantees are not
+    needed. 128 bits keeps collisions negligible and the 32-char hex digest still fits
+    the existing `content_hash` column. Results are memoized (the function is pure), so
+    repeated descriptions and the API's enqueue/release round-trip skip re-hashing.
 
     Args:
         text (str): The input text (e.g., ticket description).
@@ -10,6 +49,77 @@ def calculate_content_hash(text: str) -> str:
     Returns:
         str: The hexadecimal hash string.
     """
-    # Normalize text (lowercase, strip) to ensure 'Mouse Broken' matches 'mouse broken '
-    normalized_text = text.lower().strip()
-    return hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
\ No newline at end of file
+    return hash_normalized_description(normalize_description(text))
+
+def ticket_content_hash(description: str, normalized_description: Optional[str] = None) -> str:
+    """
+    Content hash of a stored ticket, reusing its persisted normalized description when present.
+
+    Args:
+        description (str): The raw description (fallback for rows written before the column existed).
+        normalized_description (Optional[str]): The ticket's `normalized_description` column.
+
+    Returns:
+        str: The hexadecimal hash string.
+    """
+    if normalized_description is not None:
+        return hash_normalized_description(normalized_description)
+    return calculate_content_hash(description)
+
+def split_short_descriptions(items: List[Tuple[int, str]]) -> Tuple[List[Tuple[int, str]], Dict[int, str]]:
+    """
+    Separates tickets too short to classify so they never reach the LLM.
+
+    Args:
+        items (List[Tuple[int, str]]): (ticket_id, description) pairs.
+
+    Returns:
+        Tuple[List[Tuple[int, str]], Dict[int, str]]: The classifiable pairs, and
+            ticket_id -> 'Unclassified' for the rejected ones.
+    """
+    rejected = {ticket_id: "Unclassified" for ticket_id, description in items if len(description) < MIN_DESCRIPTION_LENGTH}
+    if not rejected:
+        return items, rejected
+    return [item for item in items if item[0] not in rejected], rejected
+
+def format_batch_listing(items: List[Tuple[int, str]]) -> str:
+    """
+    Renders tickets as a numbered listing for single-prompt batch classification.
+
+    Args:
+        items (List[Tuple[int, str]]): (ticket_id, description) pairs.
+
+    Returns:
+        str: One '[n] description' line per ticket, numbered from 1 in input order.
+    """
+    # Newlines inside a description would break the one-ticket-per-line contract
+    return "\n".join(
+        "[%d] %s" % (position, description.replace("\n", " "))
+        for position, (_, description) in enumerate(items, start=1)
+    )
+
+
+def parse_batch_response(raw_text: str, items: List[Tuple[int, str]]) -> Dict[int, str]:
+    """
+    Maps a JSON object of {"<n>": "<category>"} back onto the ticket IDs it was built from.
+
+    Args:
+        raw_text (str): The model output, expected to be a JSON object keyed by listing number.
+        items (List[Tuple[int, str]]): The same (ticket_id, description) pairs used for the listing.
+
+    Returns:
+        Dict[int, str]: ticket_id -> category. Missing or malformed entries fall back to 'Unclassified'.
+    """
+    try:
+        parsed = orjson.loads(raw_text)
+    except (TypeError, ValueError):
+        parsed = None
+
+    if not isinstance(parsed, dict):
+        parsed = {}
+
+    results = {}
+    for position, (ticket_id, _) in enumerate(items, start=1):
+        category = parsed.get(str(position))
+        results[ticket_id] = category.strip() if isinstance(category, str) and category.strip() else "Unclassified"
+    return results
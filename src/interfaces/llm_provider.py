@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 
 class LLMProvider(ABC):
@@ -31,4 +32,62 @@ class LLMProvider(ABC):
             str: The selected category name. If classification fails, 
                  implementations should return a fallback (e.g., 'Unclassified').
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def classify_ticket_async(
+        self,
+        description: str,
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """
+        Non-blocking variant of `classify_ticket` for the asynchronous API worker.
+
+        The default offloads the synchronous call to a worker thread. Providers
+        with a native async client should override it to share a pooled connection.
+        """
+        return await asyncio.to_thread(self.classify_ticket, description, categories, context_examples)
+
+    def classify_batch(
+        self,
+        items: List[Tuple[int, str]],
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[int, str]:
+        """
+        Classifies several tickets at once.
+
+        The default issues one `classify_ticket` call per item. Providers should
+        override it to send a single prompt, amortizing the shared instructions
+        (and the model's prompt prefill) across the whole batch.
+
+        Args:
+            items (List[Tuple[int, str]]): (ticket_id, description) pairs.
+            categories (List[str]): A list of valid categories to choose from.
+            context_examples (Optional[List[Dict[str, str]]]): Historical examples
+                shared by every ticket in the batch.
+
+        Returns:
+            Dict[int, str]: ticket_id -> category name ('Unclassified' on failure).
+        """
+        return {
+            ticket_id: self.classify_ticket(description, categories, context_examples)
+            for ticket_id, description in items
+        }
+
+    async def classify_batch_async(
+        self,
+        items: List[Tuple[int, str]],
+        categories: List[str],
+        context_examples: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[int, str]:
+        """
+        Non-blocking variant of `classify_batch` (threadpool offload by default).
+        """
+        return await asyncio.to_thread(self.classify_batch, items, categories, context_examples)
+
+    async def aclose(self) -> None:
+        """
+        Releases network resources held by the provider (no-op by default).
+        """
+        return None
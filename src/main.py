@@ -1,13 +1,17 @@
 import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
+from sqlalchemy import update
 
 from src.adapters.gemini_adapter import GeminiAdapter
 from src.core.config import get_categories, load_config
 from src.core.database import Ticket, init_db
-from src.core.utils import calculate_content_hash  # Dependencia para FinOps
+from src.core.rate_limiter import RateLimiter
+from src.core.utils import ticket_content_hash  # Dependencia para FinOps
 
 # --- Configuration & Setup ---
 
@@ -20,9 +24,161 @@ logging.basicConfig(
 )
 logger = logging.getLogger("TriageEngine")
 
-# Load environment variables
+# Load environment variables (before the env-tunable settings below are read)
 load_dotenv()
 
+# Hashes per IN (...) clause when prefetching duplicates (stays well below SQLite's bound-parameter limit)
+HASH_LOOKUP_CHUNK_SIZE = 500
+
+# 'New' tickets loaded, classified and committed per page, bounding memory regardless of backlog size
+TICKET_PAGE_SIZE = 500
+
+# Concurrency & Proactive Throttling for the AI fan-out (keep below the provider quota).
+# Defaults match Gemini's free tier; raise them via env on paid quotas so the workers are not idle
+MAX_WORKERS = 8
+REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
+TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+# Rough budget per classification call (prompt + category name)
+ESTIMATED_TOKENS_PER_CALL = 300
+
+# Prefix for per-ticket cache-hit logs (hot loop: messages are formatted lazily by logging)
+CACHE_ICON = "💰"
+
+
+def prefetch_classified_hashes(session, hashes: List[str]) -> Dict[str, Tuple[int, str]]:
+    """
+    Finds already-classified tickets for many hashes with a few batched IN queries.
+
+    Returns:
+        Dict[str, Tuple[int, str]]: content_hash -> (ticket_id, category) of a matching ticket.
+    """
+    unique_hashes = list(dict.fromkeys(hashes))
+    cache_map: Dict[str, Tuple[int, str]] = {}
+
+    for start in range(0, len(unique_hashes), HASH_LOOKUP_CHUNK_SIZE):
+        # We exclude 'Unclassified' results because we want to retry those
+        rows = session.query(Ticket.content_hash, Ticket.id, Ticket.category).filter(
+            Ticket.content_hash.in_(unique_hashes[start:start + HASH_LOOKUP_CHUNK_SIZE]),
+            Ticket.status == "Classified",
+            Ticket.category != "Unclassified"
+        ).all()
+        for content_hash, ticket_id, category in rows:
+            cache_map.setdefault(content_hash, (ticket_id, category))
+
+    return cache_map
+
+
+def process_page(
+    session,
+    tickets: List[Ticket],
+    classifier: GeminiAdapter,
+    categories: List[str],
+    rate_limiter: RateLimiter,
+) -> Tuple[int, int]:
+    """
+    Classifies one page of 'New' tickets and commits the results with a single bulk UPDATE.
+
+    Returns:
+        Tuple[int, int]: (tickets processed, of which resolved without an AI call).
+    """
+    processed_count = 0
+    cache_hits = 0
+    # Row updates are collected here and written in one bulk UPDATE at the end of the page
+    updates: List[Dict[str, Any]] = []
+
+    # --- FINOPS LAYER: IDEMPOTENCY PREFETCH ---
+    # A. Calculate every hash up front, then resolve known ones in batched IN queries
+    # instead of one lookup per ticket
+    # (the normalized description persisted at insert time skips re-normalizing every row)
+    ticket_hashes = [
+        ticket_content_hash(ticket.description, ticket.normalized_description) for ticket in tickets
+    ]
+    cache_map = prefetch_classified_hashes(session, ticket_hashes)
+
+    misses_by_hash: Dict[str, List[Ticket]] = {}
+
+    def record(ticket: Ticket, ticket_hash: str, final_category: str, source: str) -> None:
+        # Update Record (hash saved for future reference)
+        updates.append({
+            "id": ticket.id,
+            "content_hash": ticket_hash,
+            "category": final_category,
+            "status": "Classified"
+        })
+
+        # Structured log for future analysis
+        logger.info(
+            "Ticket %d -> %s", ticket.id, final_category,
+            extra={
+                "ticket_id": ticket.id,
+                "category": final_category,
+                "source": source
+            }
+        )
+
+    for ticket, ticket_hash in zip(tickets, ticket_hashes):
+        logger.debug("Processing Ticket ID %d...", ticket.id)
+
+        # B. Check Cache (Is there a Classified ticket with same hash?)
+        cached_ticket = cache_map.get(ticket_hash)
+
+        if cached_ticket:
+            # --- CACHE HIT (Free) ---
+            cached_ticket_id, final_category = cached_ticket
+            cache_hits += 1
+            logger.info(
+                "%s Cache Hit! Ticket %d matches Ticket %d. Reusing category: '%s'",
+                CACHE_ICON, ticket.id, cached_ticket_id, final_category
+            )
+            record(ticket, ticket_hash, final_category, "cache")
+            processed_count += 1
+        else:
+            # Identical descriptions in this page are grouped and classified once
+            misses_by_hash.setdefault(ticket_hash, []).append(ticket)
+
+    # --- CACHE MISS (Cost) ---
+    # Only call AI for issues we haven't seen before, fanned out over a thread pool
+    # (network-bound) and throttled below the provider quota
+    def classify(ticket: Ticket) -> Optional[str]:
+        try:
+            rate_limiter.acquire(ESTIMATED_TOKENS_PER_CALL)
+            return classifier.classify_ticket(ticket.description, categories)
+        except Exception as e:
+            logger.error("Error processing ticket %d: %s", ticket.id, e)
+            # We continue with the next ticket instead of crashing
+            return None
+
+    groups = list(misses_by_hash.items())
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        answers = list(pool.map(classify, [group[0] for _, group in groups]))
+
+    for (ticket_hash, group), final_category in zip(groups, answers):
+        if final_category is None:
+            continue
+
+        # Business Logic: Validating the output
+        if final_category == "Unclassified":
+            logger.warning("Ticket %d could not be classified automatically.", group[0].id)
+
+        record(group[0], ticket_hash, final_category, "ai")
+        for duplicate in group[1:]:
+            # Later duplicates in this same page reuse the answer
+            cache_hits += 1
+            logger.info(
+                "%s Cache Hit! Ticket %d matches Ticket %d. Reusing category: '%s'",
+                CACHE_ICON, duplicate.id, group[0].id, final_category
+            )
+            record(duplicate, ticket_hash, final_category, "cache")
+        processed_count += len(group)
+
+    if updates:
+        # Bulk UPDATE by primary key: one executemany instead of one ORM flush per ticket.
+        # Committing per page also lets the next page's prefetch see these classifications.
+        session.execute(update(Ticket), updates)
+        session.commit()
+
+    return processed_count, cache_hits
+
 
 def main() -> None:
     logger.info("--- Starting Intelligent Triage Engine (FinOps Enabled) ---")
@@ -47,7 +203,7 @@ def main() -> None:
         sys.exit(1)
 
     try:
-        classifier = GeminiAdapter(api_key)
+        classifier = GeminiAdapter(api_key, categories)
         logger.info(f"AI Adapter initialized successfully using model: {classifier.model_name}")
     except Exception as e:
         logger.critical(f"Failed to initialize AI Adapter: {e}")
@@ -56,82 +212,42 @@ def main() -> None:
     # 4. Database Interaction Context
     # We use a context manager ('with') to ensure the session is always closed
     with SessionLocal() as session:
-        # Fetch 'New' tickets
-        tickets_to_process = session.query(Ticket).filter(Ticket.status == "New").all()
-
-        if not tickets_to_process:
-            logger.info("No new tickets found. System is idle.")
-            return
-
-        logger.info(f"Found {len(tickets_to_process)} tickets pending classification.")
-
         # 5. Process Loop
         processed_count = 0
         cache_hits = 0  # Metric for FinOps report
+        pending_seen = 0
+        rate_limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
 
-        for ticket in tickets_to_process:
-            logger.debug(f"Processing Ticket ID {ticket.id}...")
-
-            try:
-                # --- FINOPS LAYER: IDEMPOTENCY CHECK ---
-
-                # A. Calculate Hash of the description
-                ticket_hash = calculate_content_hash(ticket.description)
-                ticket.content_hash = ticket_hash # Save hash for future reference
-
-                # B. Check Cache (Is there a Classified ticket with same hash?)
-                # We exclude 'Unclassified' results because we want to retry those
-                cached_ticket = session.query(Ticket).filter(
-                    Ticket.content_hash == ticket_hash,
-                    Ticket.status == "Classified",
-                    Ticket.category != "Unclassified"
-                ).first()
-
-                final_category = None
-
-                if cached_ticket:
-                    # --- CACHE HIT (Free) ---
-                    final_category = cached_ticket.category
-                    cache_hits += 1
-                    logger.info(
-                        f"💰 Cache Hit! Ticket {ticket.id} matches Ticket {cached_ticket.id}. "
-                        f"Reusing category: '{final_category}'"
-                    )
-                else:
-                    # --- CACHE MISS (Cost) ---
-                    # Only call AI if we haven't seen this issue before
-                    final_category = classifier.classify_ticket(ticket.description, categories)
-
-                    # Business Logic: Validating the output
-                    if final_category == "Unclassified":
-                        logger.warning(
-                            f"Ticket {ticket.id} could not be classified automatically."
-                        )
-
-                # Update Record
-                ticket.category = final_category
-                ticket.status = "Classified"
-                processed_count += 1
-
-                # Structured log for future analysis
-                logger.info(
-                    f"Ticket {ticket.id} -> {final_category}",
-                    extra={
-                        "ticket_id": ticket.id,
-                        "category": final_category,
-                        "source": "cache" if cached_ticket else "ai"
-                    }
-                )
-
-            except Exception as e:
-                logger.error(f"Error processing ticket {ticket.id}: {e}")
-                # We continue with the next ticket instead of crashing
-                continue
-
-        # 6. Commit Transaction & Report
-        if processed_count > 0:
-            session.commit()
+        # 'New' tickets are streamed in primary-key pages (keyset pagination): memory stays
+        # bounded by TICKET_PAGE_SIZE and each page is committed before the next is read.
+        # A server-side cursor would not survive those commits on every backend; the id
+        # bound also skips tickets that stayed 'New' after a failed AI call.
+        last_id = 0
+        while True:
+            page = session.query(Ticket).filter(
+                Ticket.status == "New",
+                Ticket.id > last_id
+            ).order_by(Ticket.id).limit(TICKET_PAGE_SIZE).all()
+            if not page:
+                break
+
+            last_id = page[-1].id
+            pending_seen += len(page)
+            logger.info(f"Processing {len(page)} pending tickets (up to ID {last_id})...")
+
+            page_processed, page_hits = process_page(session, page, classifier, categories, rate_limiter)
+            processed_count += page_processed
+            cache_hits += page_hits
 
+            # Drop the page's ORM objects so the identity map does not grow with the backlog
+            session.expunge_all()
+
+        if pending_seen == 0:
+            logger.info("No new tickets found. System is idle.")
+            return
+
+        # 6. Report
+        if processed_count > 0:
             # ROI Report (Return on Investment)
             total_cost_saved = cache_hits  # Assuming 1 unit cost per call
             logger.info("--- Batch Processing Complete ---")
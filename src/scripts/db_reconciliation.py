@@ -1,15 +1,23 @@
 import logging
 import os
 import time
+from collections import defaultdict
+from typing import Dict, List
+
 from sqlalchemy.orm import Session
 from src.adapters.ollama_adapter import OllamaAdapter # Ajusta a GeminiAdapter si volviste a la nube
 from src.core.config import get_categories, load_config
 from src.core.database import Ticket, init_db
 from src.core.semantic_cache import SemanticCache
+from src.core.utils import ticket_content_hash
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] RECONCILIATION: %(message)s")
 logger = logging.getLogger("DB_Reconciliation")
 
+# Tickets are swept in chunks: one batched cache lookup, one batched RAG query and one
+# Semantic Cache write per chunk instead of one of each per ticket
+SWEEP_BATCH_SIZE = 100
+
 def run_db_reconciliation() -> None:
     logger.info("Initiating Database Reconciliation Sweep...")
 
@@ -34,42 +42,93 @@ def run_db_reconciliation() -> None:
     # 2. Sweep the DB
     db: Session = SessionLocal()
     try:
-        # Target tickets that bypassed the API or failed previously
-        pending_tickets = db.query(Ticket).filter(Ticket.status.in_(["Pending", "Unclassified"])).all()
-        
-        if not pending_tickets:
-            logger.info("Database is clean. Zero pending tickets found.")
-            return
+        # Target tickets that bypassed the API or failed previously, streamed in primary-key
+        # pages (keyset pagination) so memory stays bounded by SWEEP_BATCH_SIZE and each
+        # page's commits never invalidate an open cursor
+        last_id = 0
+        while True:
+            chunk = db.query(Ticket).filter(
+                Ticket.status.in_(["Pending", "Unclassified"]),
+                Ticket.id > last_id
+            ).order_by(Ticket.id).limit(SWEEP_BATCH_SIZE).all()
+            if not chunk:
+                break
+
+            last_id = chunk[-1].id
+            metrics["processed"] += len(chunk)
+            logger.info(f"Sweeping {len(chunk)} unclassified tickets (up to ID {last_id})...")
 
-        logger.info(f"Found {len(pending_tickets)} unclassified tickets. Commencing triage...")
-
-        for ticket in pending_tickets:
-            metrics["processed"] += 1
-            
-            # FINOPS SHIELD: Check Vector DB
-            cached_category = semantic_cache.check_cache(ticket.description, threshold=0.4)
-            
-            if cached_category:
-                ticket.category = cached_category
-                ticket.status = "Classified_By_Cache"
-                metrics["cache_hits"] += 1
-                logger.info(f"[ID: {ticket.id}] 🛡️ Cache Hit -> {cached_category}")
-            else:
-                # AI INFERENCE
-                past_examples = semantic_cache.get_similar_examples(ticket.description, limit=3)
-                category = classifier.classify_ticket(ticket.description, categories, past_examples)
-                
-                ticket.category = category
-                ticket.status = "Classified_By_AI"
+            # Read row fields before the first commit expires the loaded rows (no per-ticket refresh)
+            ticket_ids = [ticket.id for ticket in chunk]
+            descriptions = [ticket.description for ticket in chunk]
+            normalized_descriptions = [ticket.normalized_description for ticket in chunk]
+
+            # In-page dedup: identical descriptions (rage-clicks, monitors) share one vector
+            # lookup and one LLM call; groups[p] lists the page rows of unique description p
+            rows_by_hash: Dict[str, List[int]] = defaultdict(list)
+            for row, (description, normalized) in enumerate(zip(descriptions, normalized_descriptions)):
+                rows_by_hash[ticket_content_hash(description, normalized)].append(row)
+            groups = list(rows_by_hash.values())
+            unique_descriptions = [descriptions[group[0]] for group in groups]
+
+            # Embed the page once: lookup, RAG examples and cache teaching reuse the same rows
+            vectors = semantic_cache.embed(unique_descriptions)
+
+            # FINOPS SHIELD: Check Vector DB for the whole page at once
+            cached_categories = semantic_cache.check_cache_batch(
+                unique_descriptions, threshold=0.4, embeddings=vectors
+            )
+
+            misses = []
+            for position, (group, cached_category) in enumerate(zip(groups, cached_categories)):
+                if not cached_category:
+                    misses.append(position)
+                    continue
+                for row in group:
+                    chunk[row].category = cached_category
+                    chunk[row].status = "Classified_By_Cache"
+                    metrics["cache_hits"] += 1
+                    logger.info("[ID: %d] 🛡️ Cache Hit -> %s", ticket_ids[row], cached_category)
+            db.commit()
+
+            # AI INFERENCE (few-shot context for every miss fetched in one query)
+            examples_per_miss = semantic_cache.get_similar_examples_batch(
+                [unique_descriptions[position] for position in misses], limit=3, embeddings=vectors[misses]
+            )
+            learned = []
+            learned_positions = []
+            for position, past_examples in zip(misses, examples_per_miss):
+                category = classifier.classify_ticket(unique_descriptions[position], categories, past_examples)
                 metrics["ai_calls"] += 1
-                logger.info(f"[ID: {ticket.id}] 🧠 AI Inferred -> {category}")
-                
-                # Teach the cache
+
+                leader_row, *duplicate_rows = groups[position]
+                chunk[leader_row].category = category
+                chunk[leader_row].status = "Classified_By_AI"
+                logger.info("[ID: %d] 🧠 AI Inferred -> %s", ticket_ids[leader_row], category)
+
+                # Fan the answer out to identical tickets of this page
+                for row in duplicate_rows:
+                    chunk[row].category = category
+                    chunk[row].status = "Classified_By_Dedup"
+                    metrics["cache_hits"] += 1
+                    logger.info("[ID: %d] 🛡️ Dedup Hit -> %s", ticket_ids[row], category)
+
                 if category != "Unclassified":
-                    semantic_cache.add_to_cache(str(ticket.id), ticket.description, category)
+                    learned.append((str(ticket_ids[leader_row]), unique_descriptions[position], category))
+                    learned_positions.append(position)
 
-            # Commit dynamically to avoid locking
-            db.commit()
+                # Commit dynamically to avoid locking
+                db.commit()
+
+            # Teach the cache (one embedding pass + one Chroma write per page)
+            semantic_cache.add_many_to_cache(learned, vectors[learned_positions])
+
+            # Release the page's ORM objects before fetching the next one
+            db.expunge_all()
+
+        if metrics["processed"] == 0:
+            logger.info("Database is clean. Zero pending tickets found.")
+            return
 
     except Exception as e:
         logger.error(f"Reconciliation halted due to fatal error: {e}")
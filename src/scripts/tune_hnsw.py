@@ -0,0 +1,76 @@
+import logging
+import os
+import sys
+
+import chromadb
+
+from src.core.semantic_cache import COLLECTION_NAME, hnsw_metadata, unit_rows
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] HNSW_TUNING: %(message)s")
+logger = logging.getLogger("HNSW_Tuning")
+
+# Vectors copied per page while rebuilding (stored embeddings are reused and only L2-normalized)
+COPY_PAGE_SIZE = 1000
+
+
+def pick_graph_degree(collection_size: int) -> int:
+    """
+    Graph degree (M) for the collection size: denser graphs keep recall up as the index grows.
+    """
+    if collection_size < 10_000:
+        return 16
+    if collection_size < 100_000:
+        return 24
+    return 32
+
+
+def run_hnsw_tuning() -> None:
+    logger.info("Initiating HNSW index tuning...")
+
+    chroma_path = "/app/chroma_data" if os.path.exists("/app/chroma_data") else "./chroma_data"
+    client = chromadb.PersistentClient(path=chroma_path)
+
+    try:
+        source = client.get_collection(COLLECTION_NAME)
+    except Exception as e:
+        logger.error(f"Collection '{COLLECTION_NAME}' not found at {chroma_path}: {e}")
+        sys.exit(1)
+
+    size = source.count()
+    target = hnsw_metadata(m=pick_graph_degree(size))
+    current = source.metadata or {}
+    if all(current.get(key) == value for key, value in target.items()):
+        logger.info(f"Index already tuned for {size} vectors (M={target['hnsw:M']}). Nothing to do.")
+        return
+
+    # M and construction_ef are fixed at build time, so copy everything into a fresh index
+    rebuild_name = f"{COLLECTION_NAME}_rebuild"
+    try:
+        client.delete_collection(rebuild_name) # Leftover from an interrupted run
+    except Exception:
+        pass
+    rebuilt = client.create_collection(name=rebuild_name, metadata=target)
+
+    for offset in range(0, size, COPY_PAGE_SIZE):
+        page = source.get(
+            include=["documents", "metadatas", "embeddings"], limit=COPY_PAGE_SIZE, offset=offset
+        )
+        if not len(page["ids"]):
+            break
+        rebuilt.add(
+            ids=page["ids"],
+            documents=page["documents"],
+            metadatas=page["metadatas"],
+            # Vectors from older releases are not unit-length; in the "ip" space they would
+            # yield negative distances (false cache hits), normalizing keeps their cosine ranking
+            embeddings=unit_rows(page["embeddings"])
+        )
+
+    # Swap: the API must be restarted afterwards to pick up the rebuilt collection
+    client.delete_collection(COLLECTION_NAME)
+    rebuilt.modify(name=COLLECTION_NAME)
+
+    logger.info(f"--- REBUILD COMPLETE | Vectors: {size} | M: {target['hnsw:M']} | construction_ef: {target['hnsw:construction_ef']} ---")
+
+if __name__ == "__main__":
+    run_hnsw_tuning()